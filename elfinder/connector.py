@@ -1,7 +1,11 @@
 import os, re, time, urllib
+from itertools import chain
+from multiprocessing.pool import ThreadPool
 from django.utils.translation import ugettext as _
+from django.utils.http import http_date
 from exceptions import ElfinderErrorMessages, VolumeNotFoundError, DirNotFoundError, FileNotFoundError, NamedError, NotAnImageError
-from utils.volumes import instantiate_driver
+from utils.volumes import instantiate_driver, get_volume_id
+from utils.http import file_etag, not_modified, requested_range, RangeNotSatisfiable
 
 class ElfinderConnector:
     """
@@ -13,10 +17,10 @@ class ElfinderConnector:
     _commit = 'b0144a0'
     _netDrivers = {}
     _commands = {
-        'open' : { 'target' : False, 'tree' : False, 'init' : False, 'mimes' : False },
-        'ls' : { 'target' : True, 'mimes' : False },
-        'tree' : { 'target' : True },
-        'parents' : { 'target' : True },
+        'open' : { 'target' : False, 'tree' : False, 'init' : False, 'mimes' : False, 'limit' : False, 'cursor' : False, 'sort' : False, 'fields' : False },
+        'ls' : { 'target' : True, 'mimes' : False, 'limit' : False, 'cursor' : False, 'sort' : False, 'fields' : False },
+        'tree' : { 'target' : True, 'fields' : False },
+        'parents' : { 'target' : True, 'fields' : False },
         'tmb' : { 'targets' : True },
         'file' : { 'target' : True, 'download' : False, 'request' : False },
         'size' : { 'targets' : True },
@@ -31,25 +35,35 @@ class ElfinderConnector:
         'put' : { 'target' : True, 'content' : '', 'mimes' : False },
         'archive' : { 'targets' : True, 'type_' : True, 'mimes' : False },
         'extract' : { 'target' : True, 'mimes' : False },
-        'search' : { 'q' : True, 'mimes' : False },
-        'info' : { 'targets' : True, 'options': False },
+        'search' : { 'q' : True, 'mimes' : False, 'fields' : False },
+        'info' : { 'targets' : True, 'options': False, 'fields' : False },
         'dim' : { 'target' : True },
         'resize' : {'target' : True, 'width' : True, 'height' : True, 'mode' : False, 'x' : False, 'y' : False, 'degree' : False },
         #TODO: implement netmount
         'netmount'  : { 'protocol' : True, 'host' : True, 'path' : False, 'port' : False, 'user' : True, 'pass' : True, 'alias' : False, 'options' : False}
     }
 
-    def __init__(self, opts, session = None):
+    def __init__(self, opts, session = None, lazy = False):
 
         if not 'roots' in opts:
             opts['roots'] = []
 
+        #root options by volume id, roots are mounted on first use
+        self._roots = {}
+        self._root_ids = []
         self._volumes = {}
         self._default = None
-        self._loaded = False
+        self._mimes = None
+        self._fields = None
+        #return generators instead of file lists where possible
+        self._lazy = lazy
         self._session = session
         self._time =  time.time()
+        #time spent on each request phase, see debug_info()
+        self._phases = { 'mount' : 0, 'command' : 0 }
         self._debug = 'debug' in opts and opts['debug'] 
+        #threads used to process the targets of multi-target commands
+        self._workers = int(opts['workers']) if 'workers' in opts and opts['workers'] else 1
         self._uploadDebug = ''
         self._mountErrors = []
         
@@ -61,23 +75,21 @@ class ElfinderConnector:
         for o in opts['roots']:
 
             try:
-                volume = instantiate_driver(o)
+                id_ = get_volume_id(o)
             except Exception as e:
                 self._mountErrors.append(e.__unicode__())
                 continue
 
-            id_ = volume.id()
-            self._volumes[id_] = volume
-            if not self._default and volume.is_readable():
-                self._default = self._volumes[id_]
-
-        self._loaded = (self._default is not None)
+            if not id_ in self._roots:
+                self._roots[id_] = o
+                self._root_ids.append(id_)
     
     def loaded(self):
         """
-        Check if the volume driver is loaded
+        Check if the volume driver is loaded. This mounts the configured
+        roots until a readable one is found.
         """
-        return self._loaded
+        return self._default_volume() is not None
 
     def version(self, commit=False):
         """
@@ -128,7 +140,7 @@ class ElfinderConnector:
         """
         Exec command and return result
         """        
-        if not self._loaded:
+        if not self._roots:
             return { 'error' : self.error(ElfinderErrorMessages.ERROR_CONF, ElfinderErrorMessages.ERROR_CONF_NO_VOL)}
         
         if not self.commandExists(cmd):
@@ -140,17 +152,29 @@ class ElfinderConnector:
                 return {'error' : self.error(ElfinderErrorMessages.ERROR_INV_PARAMS, cmd)}
         
         #set mimes filter and pop mimes from the arguments list
-        if 'mimes' in kwargs:
+        #volumes mounted later on will pick up the filter in _mount()
+        #a filter set by a previous command is reset
+        if 'mimes' in kwargs or self._mimes is not None:
+            self._mimes = kwargs.pop('mimes') if 'mimes' in kwargs else None
+            for id_ in self._volumes:
+                self._volumes[id_].set_mimes_filter(self._mimes)
+        
+        #same for the optional fileinfo fields, a list or a comma-separated string
+        if 'fields' in kwargs or self._fields is not None:
+            self._fields = kwargs.pop('fields') if 'fields' in kwargs else None
+            if isinstance(self._fields, basestring):
+                self._fields = [f.strip() for f in self._fields.split(',')]
             for id_ in self._volumes:
-                self._volumes[id_].set_mimes_filter(kwargs['mimes'])
-            kwargs.pop('mimes')
+                self._volumes[id_].set_fields(self._fields)
 
         debug = self._debug or ('debug' in kwargs and int(kwargs['debug']))
         #remove debug kewyord argument  
         if 'debug' in kwargs:
             kwargs.pop('debug')
 
+        start, mount = time.time(), self._phases['mount']
         result = getattr(self, '_%s' % cmd)(**kwargs)
+        self._phases['command'] += time.time() - start - (self._phases['mount'] - mount)
         
         #checked for removed items as these are not directly returned
         if 'removed' in result:
@@ -164,17 +188,31 @@ class ElfinderConnector:
         #TODO: a signal must be sent here
         
         if debug:
-            result['debug'] = {
-                'connector' : 'yawd-elfinder',
-                'time' : time.time() - self._time,
-                'upload' : self._uploadDebug,
-                'volumes' : [v.debug() for v in self._volumes.values()],
-                'mountErrors' : self._mountErrors
-            }
+            result['debug'] = self.debug_info()
 
         return result
+    
+    def debug_info(self):
+        """
+        Return the debug info included in command results in debug mode.
+        Apart from the total ``time`` spent since the connector was created,
+        ``phases`` holds the time spent on mounting volumes (``mount``) and on
+        executing commands (``command``, not including the mount time).
+        Note that lazy file lists (see the ``lazy`` constructor argument) are
+        generated while the response is serialized. The ``volumes`` list holds
+        the :func:`elfinder.volumes.base.ElfinderVolumeDriver.debug` info of each
+        mounted volume.
+        """
+        return {
+            'connector' : 'yawd-elfinder',
+            'time' : time.time() - self._time,
+            'phases' : self._phases.copy(),
+            'upload' : self._uploadDebug,
+            'volumes' : [v.debug() for v in self._volumes.values()],
+            'mountErrors' : self._mountErrors
+        }
 
-    def _open(self, target='', init=False, tree=False):
+    def _open(self, target='', init=False, tree=False, limit=None, cursor='', sort=''):
         """
         **Command**: Open a directory
         
@@ -185,7 +223,13 @@ class ElfinderConnector:
                 :files:        opened directory content [and dirs tree if 'tree' argument is ``True``]
                 :api:          api version (if 'init' argument is ``True``)
                 :uplMaxSize:   The maximum allowed upload size (if 'init' argument is ``True``)
+                :cursor:       The cursor to request the next page with (if there is one)
                 :error:        on failed
+        
+        If ``limit``, ``cursor`` or ``sort`` is set, only a single page of
+        the directory content is returned, holding at most ``limit`` files sorted
+        by ``sort`` (``name``, ``ts``, ``size`` or ``mime``, prefixed with ``-``
+        for descending order). See :func:`elfinder.volumes.base.ElfinderVolumeDriver.page`.
                 
         This method should not be invoked 
         directly, the :meth:`elfinder.connector.ElfinderConnector.execute`
@@ -214,7 +258,9 @@ class ElfinderConnector:
                 #on init request we can get invalid dir hash -
                 #dir which can not be opened now, but remembered by client,
                 #so open default volume
-                volume = self._default
+                volume = self._default_volume()
+                if volume is None:
+                    return { 'error' : self.error(ElfinderErrorMessages.ERROR_CONF, ElfinderErrorMessages.ERROR_CONF_NO_VOL)}
         
         try:
             cwd = volume.dir(hash_=target, resolve_link=True)
@@ -235,23 +281,27 @@ class ElfinderConnector:
         files = []
         #get folder trees
         if tree:
-            for id_ in self._volumes:
-                files += self._volumes[id_].tree(exclude=target)
+            for v in self._mount_all():
+                files += v.tree(exclude=target)
         
         #get current working directory files list and add to files if not already present
         try:
-            ls = volume.scandir(cwd['hash'])
+            if limit or cursor or sort:
+                ls, cursor = volume.page(cwd['hash'], int(limit) if limit else None, cursor, sort or 'name')
+            else:
+                ls = volume.scandir(cwd['hash'], lazy=self._lazy)
+        except ValueError:
+            return {'error' : self.error(ElfinderErrorMessages.ERROR_INV_PARAMS, 'open')}
         except Exception as e:
             return {'error' : self.error(ElfinderErrorMessages.ERROR_OPEN, cwd['name'], e)}
         
-        for file_ in ls:
-            if not file_ in files:
-                files.append(file_)
+        hashes = set(file_['hash'] for file_ in files)
+        ls = (file_ for file_ in ls if not file_['hash'] in hashes)
 
         result = {
             'cwd' : cwd,
             'options' : volume.options(cwd['hash']),
-            'files' : files
+            'files' : chain(files, ls) if self._lazy else files + list(ls)
         }
 
         if init:
@@ -259,18 +309,34 @@ class ElfinderConnector:
             result['netDrivers'] = self._netDrivers.keys()
             result['uplMaxSize'] = volume.upload_max_size()
         
+        if cursor:
+            result['cursor'] = cursor
+        
         return result
 
-    def _ls(self, target):
+    def _ls(self, target, limit=None, cursor='', sort=''):
         """
         **Command**: Return a directory's file list. This method should not be invoked 
         directly, the :meth:`elfinder.connector.ElfinderConnector.execute`
         method must be used.
+        
+        If ``limit``, ``cursor`` or ``sort`` is set, a single page of the
+        list is returned, see :meth:`elfinder.connector.ElfinderConnector._open`.
         """
         try:
-            return { 'list' : self._volume(target).ls(target) }
+            volume = self._volume(target)
+            if not (limit or cursor or sort):
+                return { 'list' : volume.ls(target, lazy=self._lazy) }
+            files, cursor = volume.page(target, int(limit) if limit else None, cursor, sort or 'name')
+        except ValueError:
+            return {'error' : self.error(ElfinderErrorMessages.ERROR_INV_PARAMS, 'ls')}
         except:
             return { 'error' : self.error(ElfinderErrorMessages.ERROR_OPEN, '#%s' % target) }
+        
+        result = { 'list' : [f['name'] for f in files] }
+        if cursor:
+            result['cursor'] = cursor
+        return result
 
     def _tree(self, target):
         """
@@ -300,14 +366,16 @@ class ElfinderConnector:
         directly, the :meth:`elfinder.connector.ElfinderConnector.execute`
         method must be used.
         """
-        result  = { 'images' : {} }
-        for target in targets:
+        def tmb(target):
             try:
-                thumb = self._volume(target).tmb(target)
-                if thumb:
-                    result['images'][target] = thumb  
+                return self._volume(target).tmb(target)
             except (VolumeNotFoundError, NotAnImageError):
-                continue
+                return None
+
+        result  = { 'images' : {} }
+        for target, thumb in zip(targets, self._map(tmb, targets)):
+            if thumb:
+                result['images'][target] = thumb
 
         return result
     
@@ -319,7 +387,15 @@ class ElfinderConnector:
         Used to download the file as well.
         
         Return:
-            An array containing an opened file pointer, the root itself and the required response headers
+            An array containing an opened file pointer, the root itself and the required response headers.
+            If the volume lets the web server send the file (see 
+            :func:`elfinder.volumes.base.ElfinderVolumeDriver.sendfile`),
+            no file pointer is returned and the ``sendfile`` key is set instead.
+            
+        Conditional requests (``If-None-Match``, ``If-Modified-Since``) are
+        answered with a 304 response and single-range requests with a 206 
+        response; the ``range`` key then holds the requested ``(start, end)``
+        byte positions. ``HEAD`` requests return the headers only.
             
         This method should not be invoked 
         directly, the :meth:`elfinder.connector.ElfinderConnector.execute`
@@ -335,13 +411,22 @@ class ElfinderConnector:
         except (VolumeNotFoundError, FileNotFoundError): 
             return { 'error' : _('File not found'), 'header' : { 'Status' : 404 }, 'raw' : True }
         
+        if file_['mime'] == 'directory':
+            return { 'error' : _('File not found'), 'header' : { 'Status' : 404 }, 'raw' : True }
+        
         if not file_['read']:
             return { 'error' : _('Access denied'), 'header' : { 'Status' : 403 }, 'raw' : True }
-        
+
+        #conditional GET
+        validators = { 'ETag' : file_etag(file_) }
         try:
-            fp = volume.open(target)
-        except os.error: #Normally this could raise a FileNotFoundError as well, but we already checked this
-            return { 'error' : _('File not found'), 'header' : { 'Status' : 404 }, 'raw' : True }
+            validators['Last-Modified'] = http_date(file_['ts'])
+        except (TypeError, ValueError):
+            pass
+
+        if not_modified(request, validators['ETag'], file_['ts']):
+            validators['Status'] = 304
+            return { 'header' : validators, 'raw' : True }
 
         if download:
             disp = 'attachment'
@@ -364,19 +449,52 @@ class ElfinderConnector:
         else:
             filename = ''
 
+        header = {
+            'Content-Type' : mime, 
+            'Content-Disposition' : '%s; %s' % (disp, filename),
+            'Content-Location' : file_['name'].encode('utf-8'),  #unicode filename support
+            #'Connection' : 'close'
+        }
+        header.update(validators)
+
+        #let the web server send the file
+        sendfile = volume.sendfile(target)
+        if sendfile:
+            header[sendfile[0]] = sendfile[1]
+            return { 'info' : file_, 'header' : header, 'sendfile' : True }
+
+        try:
+            range_ = requested_range(request, file_['size'], validators['ETag'], validators.get('Last-Modified'))
+        except RangeNotSatisfiable:
+            return { 'header' : { 'Status' : 416, 'Content-Range' : 'bytes */%s' % file_['size'] }, 'raw' : True }
+
+        header['Accept-Ranges'] = 'bytes'
+        header['Content-Transfer-Encoding'] = 'binary'
+        header['Content-Length'] = file_['size']
+        
+        if range_:
+            header['Status'] = 206
+            header['Content-Range'] = 'bytes %s-%s/%s' % (range_[0], range_[1], file_['size'])
+            header['Content-Length'] = range_[1] - range_[0] + 1
+
+        #do not open the file for HEAD requests
+        if request and hasattr(request, 'method') and request.method == 'HEAD':
+            return { 'info' : file_, 'header' : header, 'raw' : True }
+
+        try:
+            fp = volume.open(target)
+        except os.error: #Normally this could raise a FileNotFoundError as well, but we already checked this
+            return { 'error' : _('File not found'), 'header' : { 'Status' : 404 }, 'raw' : True }
+
         result = {
             'volume' : volume,
             'pointer' : fp,
             'info' : file_,
-            'header' : {
-                'Content-Type' : mime, 
-                'Content-Disposition' : '%s; %s' % (disp, filename),
-                'Content-Location' : file_['name'].encode('utf-8'),  #unicode filename support
-                'Content-Transfer-Encoding' : 'binary',
-                'Content-Length' : file_['size'],
-                #'Connection' : 'close'
-            }
+            'header' : header
         }
+        
+        if range_:
+            result['range'] = range_
 
         return result
 
@@ -388,21 +506,21 @@ class ElfinderConnector:
         directly, the :meth:`elfinder.connector.ElfinderConnector.execute`
         method must be used.
         """
-        size = 0
-        
-        for target in targets:
+        def size(target):
             try:
                 volume = self._volume(target)
                 file_ = volume.file(target)
             except (VolumeNotFoundError, FileNotFoundError):
                 file_ = { 'read' : 0 }
                 
-            if not file_['read']:
+            return volume.size(target) if file_['read'] else None
+        
+        sizes = self._map(size, targets)
+        for target, value in zip(targets, sizes):
+            if value is None:
                 return { 'error' : self.error(ElfinderErrorMessages.ERROR_OPEN, u'#%s' % target) }
-            
-            size += volume.size(target)
 
-        return { 'size' : size }
+        return { 'size' : sum(sizes) }
 
     def _mkdir(self, target, name):
         """
@@ -469,22 +587,19 @@ class ElfinderConnector:
         directly, the :meth:`elfinder.connector.ElfinderConnector.execute`
         method must be used. 
         """
-        result = { 'added' : [] }
-        
-        for target in targets:
+        def duplicate(target):
             try:
                 volume = self._volume(target)
                 volume.file(target)
             except (VolumeNotFoundError, FileNotFoundError):
-                result['warning'] = self.error(ElfinderErrorMessages.ERROR_COPY, u'#%s' % target, ElfinderErrorMessages.ERROR_FILE_NOT_FOUND)
-                continue
+                return (None, self.error(ElfinderErrorMessages.ERROR_COPY, u'#%s' % target, ElfinderErrorMessages.ERROR_FILE_NOT_FOUND))
             
             try:
-                result['added'].append(volume.duplicate(target, suffix))
+                return (volume.duplicate(target, suffix), None)
             except Exception as e:
-                result['warning'] = self.error(e)
+                return (None, self.error(e))
         
-        return result
+        return self._aggregate({ 'added' : [] }, 'added', self._map(duplicate, targets))
     
     def _rm(self, targets):
         """
@@ -492,23 +607,22 @@ class ElfinderConnector:
         directly, the :meth:`elfinder.connector.ElfinderConnector.execute`
         method must be used.
         """
-        result  = {'removed' : []}
-
-        for target in targets:
+        def rm(target):
             try:
                 volume = self._volume(target)
             except VolumeNotFoundError:
-                result['warning'] = self.error(ElfinderErrorMessages.ERROR_RM, '#%s' % target, ElfinderErrorMessages.ERROR_FILE_NOT_FOUND)
-                continue
+                return (None, self.error(ElfinderErrorMessages.ERROR_RM, '#%s' % target, ElfinderErrorMessages.ERROR_FILE_NOT_FOUND))
 
             try:
                 volume.rm(target)
             except NamedError as e:
-                result['warning'] = self.error(e, e.name)
+                return (None, self.error(e, e.name))
             except Exception as e:
-                result['warning'] = self.error(e)
+                return (None, self.error(e))
+            return (None, None)
 
-        return result
+        #removed files are collected from the volumes in execute()
+        return self._aggregate({'removed' : []}, None, self._map(rm, targets))
     
     def _upload(self, target, FILES, html=False):
         """
@@ -566,21 +680,20 @@ class ElfinderConnector:
         except VolumeNotFoundError:
             return { 'error' : self.error(error, u'#%s' % targets[0], ElfinderErrorMessages.ERROR_TRGDIR_NOT_FOUND, u'#%s' % dst) }
         
-        for target in targets:
+        def paste(target):
             try:
                 srcVolume = self._volume(target)
             except VolumeNotFoundError:
-                result['warning'] = self.error(error, u'#%s' % target, ElfinderErrorMessages.ERROR_FILE_NOT_FOUND)
-                continue
+                return (None, self.error(error, u'#%s' % target, ElfinderErrorMessages.ERROR_FILE_NOT_FOUND))
 
             try:
-                result['added'].append(dstVolume.paste(srcVolume, target, dst, cut))
+                return (dstVolume.paste(srcVolume, target, dst, cut), None)
             except NamedError as e:
-                result['warning'] = self.error(e, e.name)
+                return (None, self.error(e, e.name))
             except Exception as e:
-                result['warning'] = self.error(e)
+                return (None, self.error(e))
 
-        return result
+        return self._aggregate(result, 'added', self._map(paste, targets))
 
     def _get(self, target):
         """
@@ -671,8 +784,11 @@ class ElfinderConnector:
         method must be used.
         """
         q = q.strip()
+        if self._lazy:
+            return {'files' : chain(*[volume.search(q, lazy=True) for volume in self._mount_all()])}
+
         result = []
-        for volume in self._volumes.values():
+        for volume in self._mount_all():
             result += volume.search(q)
         return {'files' : result}
 
@@ -686,20 +802,18 @@ class ElfinderConnector:
         if isinstance(options, basestring):
             options = int(options)
         
-        files = []
-        for hash_ in targets:
+        def info(hash_):
             try:
                 volume = self._volume(hash_)
                 if options:
-                    options = volume.options(hash_)
-                    options.update(volume.file(hash_))
-                    files.append(options)
-                else:
-                    files.append(volume.file(hash_))
+                    file_ = volume.options(hash_)
+                    file_.update(volume.file(hash_))
+                    return file_
+                return volume.file(hash_)
             except:
-                continue
+                return None
 
-        return {'files' : files}
+        return {'files' : [f for f in self._map(info, targets) if f is not None]}
 
     def _dim(self, target):
         """
@@ -734,10 +848,111 @@ class ElfinderConnector:
 
     def _volume(self, hash_):
         """
-        Return root - file's owner
+        Return root - file's owner. The volume is mounted if this is
+        the first time it is used.
         """
         if hash_:
-            for id_, v in self._volumes.items():
-                if hash_.find(id_) == 0:
-                    return v
+            #volume ids end with '_', so try each hash prefix up to an '_'
+            i = hash_.find('_')
+            while i != -1:
+                id_ = hash_[:i+1]
+                if id_ in self._roots:
+                    return self._mount(id_)
+                i = hash_.find('_', i+1)
         raise VolumeNotFoundError()
+
+    def _mount(self, id_):
+        """
+        Return the mounted volume for the ``id_`` volume id, mounting it
+        if necessary. Raises ``VolumeNotFoundError`` if the volume
+        cannot be mounted.
+        """
+        if id_ in self._volumes:
+            return self._volumes[id_]
+
+        if not id_ in self._roots:
+            raise VolumeNotFoundError()
+
+        start = time.time()
+        try:
+            volume = instantiate_driver(self._roots[id_])
+        except Exception as e:
+            self._mountErrors.append(e.__unicode__())
+            #do not attempt to mount this root again
+            del self._roots[id_]
+            self._root_ids.remove(id_)
+            raise VolumeNotFoundError()
+        finally:
+            self._phases['mount'] += time.time() - start
+
+        if self._mimes is not None:
+            volume.set_mimes_filter(self._mimes)
+        if self._fields is not None:
+            volume.set_fields(self._fields)
+
+        self._volumes[id_] = volume
+        return volume
+
+    def _mount_all(self):
+        """
+        Mount all roots and return a list of the mounted volumes.
+        """
+        volumes = []
+        for id_ in list(self._root_ids):
+            try:
+                volumes.append(self._mount(id_))
+            except VolumeNotFoundError:
+                continue
+        return volumes
+
+    def _map(self, func, targets):
+        """
+        Return the ``func(target)`` results for each one of the ``targets``,
+        in the order of ``targets``. If the ``workers`` optionset setting is
+        greater than 1, targets are processed concurrently by a pool of
+        (at most) ``workers`` threads.
+        """
+        if self._workers < 2 or len(targets) < 2:
+            return map(func, targets)
+        
+        #mount the volumes beforehand, so that workers do not mount them concurrently
+        for target in targets:
+            try:
+                self._volume(target)
+            except VolumeNotFoundError:
+                continue
+        
+        pool = ThreadPool(min(self._workers, len(targets)))
+        try:
+            return pool.map(func, targets)
+        finally:
+            pool.close()
+            pool.join()
+    
+    def _aggregate(self, result, key, outcomes):
+        """
+        Aggregate a list of ``(value, warning)`` ``outcomes`` into ``result``.
+        Values are appended to ``result[key]``. The warning of the last
+        target that failed is kept, as if targets were processed serially.
+        """
+        for value, warning in outcomes:
+            if warning:
+                result['warning'] = warning
+            elif key:
+                result[key].append(value)
+        return result
+
+    def _default_volume(self):
+        """
+        Return the default volume, i.e. the first readable root.
+        """
+        if self._default is None:
+            for id_ in list(self._root_ids):
+                try:
+                    volume = self._mount(id_)
+                except VolumeNotFoundError:
+                    continue
+                if volume.is_readable():
+                    self._default = volume
+                    break
+        return self._default
@@ -0,0 +1,123 @@
+import time, threading
+from functools import partial
+from multiprocessing.pool import ThreadPool
+from optparse import make_option
+from django.core.management.base import BaseCommand, CommandError
+from elfinder.conf import settings as ls
+from elfinder.utils.volumes import instantiate_driver
+
+class Command(BaseCommand):
+    """
+    Walk the roots of an optionset with a pool of worker threads and fill
+    the cache with their directory listings and file stats, exactly as the
+    connector would.
+    """
+    args = '<optionset> [root id ...]'
+    help = 'Fill the cache with the directory listings and file stats of an optionset\'s roots.'
+    option_list = BaseCommand.option_list + (
+        make_option('--depth', type='int', default=0,
+            help='Number of directory levels to walk, 0 to walk the whole tree (default).'),
+        make_option('--workers', type='int', default=4,
+            help='Number of directories to read concurrently (default 4).'),
+        make_option('--rate', type='float', default=0,
+            help='Maximum number of directories to read per second, 0 for no limit (default).'),
+    )
+
+    def handle(self, *args, **options):
+        if not args or not args[0] in ls.ELFINDER_CONNECTOR_OPTION_SETS:
+            raise CommandError('Please provide a valid optionset name')
+
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+
+        self.verbosity = int(options.get('verbosity', 1))
+        self.interval = 1.0 / options['rate'] if options['rate'] > 0 else 0
+        self.lock = threading.Lock()
+        self.next_read = 0
+
+        pool = ThreadPool(options['workers'])
+        try:
+            for root_options in ls.ELFINDER_CONNECTOR_OPTION_SETS[args[0]]['roots']:
+                if 'driver' in root_options and (not args[1:] or root_options.get('id') in args[1:]):
+                    self.warm(instantiate_driver(root_options), pool, options['depth'])
+        finally:
+            pool.close()
+            pool.join()
+
+    def warm(self, volume, pool, depth):
+        """
+        Walk the ``volume`` tree level by level, up to ``depth`` levels.
+        """
+        start = time.time()
+        self.dirs = self.files = 0
+        self.counters = {}
+        self.count(volume.request_view(), lambda view: view.stat(view._root))
+
+        level, dirs = 0, [volume._root]
+        while dirs and (not depth or level < depth):
+            subdirs = []
+            for result in pool.imap_unordered(partial(self.warm_dir, volume), dirs):
+                subdirs.extend(result)
+            dirs = subdirs
+            level += 1
+
+            elapsed = time.time() - start
+            self.stdout.write('%s: level %s, %s directories and %s files in %.1f seconds (%.1f directories/s)' %
+                              (volume.id(), level, self.dirs, self.files, elapsed, self.dirs / elapsed if elapsed else 0))
+
+        if self.verbosity > 1:
+            counters = self.counters
+            self.stdout.write('%s: %s' % (volume.id(), ', '.join(['%s %s' % (k, counters[k]) for k in sorted(counters) if counters[k]])))
+
+    def warm_dir(self, volume, path):
+        """
+        Cache the listing of the ``path`` directory and the stats of its
+        files. Return the subdirectories to walk next.
+        """
+        self.throttle()
+        try:
+            #a view per directory, so that its memoized data does not pile up over the walk
+            stats = self.count(volume.request_view(), lambda view: view.stat_many(view._get_cached_dir(path)))
+        except Exception as e:
+            self.stderr.write('Could not read %s: %s' % (path, e))
+            return []
+
+        with self.lock:
+            self.dirs += 1
+            self.files += len(stats)
+
+        if self.verbosity > 1:
+            self.stdout.write('%s: %s' % (volume.id(), path))
+
+        #do not follow links, they could lead to loops
+        return [p for p, stat in stats.items() if stat['mime'] == 'directory'
+                and stat['read'] and not stat['hidden'] and not stat.get('alias')]
+
+    def count(self, view, read):
+        """
+        Call ``read`` with the ``view`` of a volume and add the view's 
+        counters to the totals of the walk.
+        """
+        try:
+            return read(view)
+        finally:
+            counters = view.debug()['counters']
+            with self.lock:
+                for k, v in counters.items():
+                    self.counters[k] = self.counters.get(k, 0) + v
+
+    def throttle(self):
+        """
+        Sleep as long as it takes to keep reading at most ``--rate``
+        directories per second.
+        """
+        if not self.interval:
+            return
+
+        with self.lock:
+            now = time.time()
+            wait = self.next_read - now
+            self.next_read = max(now, self.next_read) + self.interval
+
+        if wait > 0:
+            time.sleep(wait)
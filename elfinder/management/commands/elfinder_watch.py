@@ -0,0 +1,85 @@
+import os, sys
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+from django.core.management.base import BaseCommand, CommandError
+from elfinder.conf import settings as ls
+from elfinder.utils.volumes import instantiate_driver
+from elfinder.volumes.filesystem import ElfinderVolumeLocalFileSystem
+
+class Command(BaseCommand):
+    """
+    Watch the local filesystem roots of an optionset through Linux inotify
+    and drop the cached data of files as other applications change them.
+    Requires the `pyinotify <https://pypi.python.org/pypi/pyinotify>`_ package.
+    """
+    args = '<optionset> [root id ...]'
+    help = 'Watch the local filesystem roots of an optionset and invalidate their cached data on changes.'
+
+    def handle(self, *args, **options):
+        if pyinotify is None:
+            raise CommandError('The pyinotify package is required to watch volumes')
+
+        if not args or not args[0] in ls.ELFINDER_CONNECTOR_OPTION_SETS:
+            raise CommandError('Please provide a valid optionset name')
+
+        self.verbosity = int(options.get('verbosity', 1))
+        self.volumes = []
+        for root_options in ls.ELFINDER_CONNECTOR_OPTION_SETS[args[0]]['roots']:
+            if not 'driver' in root_options or (args[1:] and not root_options.get('id') in args[1:]):
+                continue
+            volume = instantiate_driver(root_options)
+            if not isinstance(volume, ElfinderVolumeLocalFileSystem):
+                self.stderr.write('Skipping %s: only local filesystem volumes can be watched' % volume.id())
+                continue
+            self.volumes.append(volume)
+
+        if not self.volumes:
+            raise CommandError('No local filesystem volumes found')
+
+        #longest roots first, for nested roots
+        self.volumes.sort(key=lambda v: len(v._root), reverse=True)
+
+        manager = pyinotify.WatchManager()
+        mask = pyinotify.IN_CREATE | pyinotify.IN_DELETE | pyinotify.IN_MOVED_FROM | pyinotify.IN_MOVED_TO | pyinotify.IN_CLOSE_WRITE | pyinotify.IN_ATTRIB
+        for volume in self.volumes:
+            manager.add_watch(volume._root, mask, rec=True, auto_add=True)
+            self.stdout.write('Watching %s (%s)' % (volume._root, volume.id()))
+
+        pyinotify.Notifier(manager, default_proc_fun=self.process).loop()
+
+    def process(self, event):
+        """
+        Invalidate the cached data of the ``event`` path.
+        """
+        path = event.pathname
+        if isinstance(path, str):
+            #inotify reports byte strings, while volume roots are unicode
+            try:
+                path = path.decode(sys.getfilesystemencoding() or 'utf-8')
+            except UnicodeDecodeError:
+                self.stderr.write('Could not decode %r, skipping it' % path)
+                return
+        
+        for volume in self.volumes:
+            if path == volume._root or path.startswith(volume._root + os.sep):
+                break
+        else:
+            return
+
+        #the volume's own thumbnails
+        tmb_path = volume._options['tmbPath']
+        if tmb_path and (path == tmb_path or path.startswith(tmb_path + os.sep)):
+            return
+
+        removed = bool(event.mask & (pyinotify.IN_DELETE | pyinotify.IN_MOVED_FROM))
+        moved = bool(event.mask & pyinotify.IN_MOVED_TO)
+        try:
+            #the cached stat of a directory may have been evicted, rely on IN_ISDIR
+            volume.request_view().changed(path, removed, event.dir, moved)
+        except Exception as e:
+            self.stderr.write('Could not invalidate %s: %s' % (path, e))
+        else:
+            if self.verbosity > 1:
+                self.stdout.write('%s %s' % (event.maskname, path))
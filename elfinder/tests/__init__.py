@@ -1,2 +1,4 @@
+from commands import *
 from connector import *
+from views import *
 from volumes import *
\ No newline at end of file
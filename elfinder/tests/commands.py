@@ -0,0 +1,103 @@
+import os, sys, threading
+from multiprocessing.pool import ThreadPool
+from StringIO import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.utils import unittest
+from elfinder.conf import settings as ls
+from elfinder.management.commands import elfinder_warm, elfinder_watch
+from elfinder.management.commands.elfinder_watch import pyinotify
+from elfinder.utils.volumes import instantiate_driver
+
+class ElfinderWarmCommandTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        settings.MEDIA_ROOT = os.path.join(os.path.dirname(__file__), 'media')
+        
+        self.root = ls.ELFINDER_CONNECTOR_OPTION_SETS['default']['roots'][0]
+        self.root['path'] = settings.MEDIA_ROOT
+        self.root['URL'] = settings.MEDIA_URL
+        
+        self.volume = instantiate_driver(self.root)
+        
+    def test_warm(self):
+        self.volume.invalidate()
+        out = StringIO()
+        call_command('elfinder_warm', 'default', self.root['id'], depth=1, stdout=out)
+        self.assertIn('%s: level 1, 1 directories' % self.volume.id(), out.getvalue())
+        self.assertNotIn('level 2', out.getvalue())
+        
+        #the root listing and its file stats are cached
+        view = instantiate_driver(self.root)
+        view.stat_many(view._get_cached_dir(view._root))
+        self.assertEqual(view.debug()['counters']['scandir'], 0)
+        self.assertEqual(view.debug()['counters']['stat'], 0)
+        
+        out = StringIO()
+        call_command('elfinder_warm', 'default', self.root['id'], workers=2, rate=1000, verbosity=2, stdout=out)
+        self.assertIn('level 2', out.getvalue())
+        self.assertIn('cacheHit', out.getvalue())
+        
+        #memoized data is dropped after each directory
+        command = elfinder_warm.Command()
+        command.verbosity, command.interval, command.lock, command.stdout = 1, 0, threading.Lock(), StringIO()
+        volume = instantiate_driver(self.root)
+        memos = dict(volume._key_chains), dict(volume._attr_memo), dict(volume._dir_tokens)
+        pool = ThreadPool(1)
+        try:
+            command.warm(volume, pool, 0)
+        finally:
+            pool.close()
+        self.assertGreater(command.counters['cacheGet'], 0)
+        self.assertEqual((volume._key_chains, volume._attr_memo, volume._dir_tokens), memos)
+
+class ElfinderWatchCommandTestCase(unittest.TestCase):
+    
+    class Event(object):
+        """
+        The attributes of a pyinotify event that the command reads.
+        """
+        def __init__(self, pathname, mask, maskname):
+            self.pathname, self.mask, self.maskname = pathname, mask, maskname
+            self.dir = bool(mask & pyinotify.IN_ISDIR)
+    
+    def setUp(self):
+        settings.MEDIA_ROOT = os.path.join(os.path.dirname(__file__), 'media')
+        
+        self.root = ls.ELFINDER_CONNECTOR_OPTION_SETS['default']['roots'][0]
+        self.root['path'] = settings.MEDIA_ROOT
+        self.root['URL'] = settings.MEDIA_URL
+        
+        self.volume = instantiate_driver(self.root)
+        self.command = elfinder_watch.Command()
+        self.command.volumes = [self.volume]
+        self.command.verbosity = 1
+        self.command.stderr = StringIO()
+    
+    @unittest.skipIf(pyinotify is None, 'pyinotify is not installed')
+    def test_process(self):
+        path = self.volume._join_path(self.volume._root, 'files')
+        new = self.volume._join_path(path, 'watched.txt')
+        self.volume._get_cached_dir(path)
+        
+        open(new, 'w').close()
+        try:
+            #events carry byte string paths
+            self.command.process(self.Event(new.encode(sys.getfilesystemencoding() or 'utf-8'), pyinotify.IN_CREATE, 'IN_CREATE'))
+            self.assertIn(new, self.volume.request_view()._get_cached_dir(path))
+        finally:
+            os.remove(new)
+        
+        #non-ASCII file names do not stop the watcher, whether they can be decoded or not
+        name = os.path.join(settings.MEDIA_ROOT, 'files', u'caf\xe9.txt'.encode('utf-8'))
+        self.command.process(self.Event(name, pyinotify.IN_DELETE, 'IN_DELETE'))
+        self.command.process(self.Event(os.path.join(settings.MEDIA_ROOT, 'files', '\xff'), pyinotify.IN_DELETE, 'IN_DELETE'))
+        
+        #directories moved in or out drop the cached data below them, even if their own stat was evicted
+        directory = self.volume._join_path(path, 'directory')
+        for mask, maskname in ((pyinotify.IN_MOVED_FROM, 'IN_MOVED_FROM|IN_ISDIR'), (pyinotify.IN_MOVED_TO, 'IN_MOVED_TO|IN_ISDIR')):
+            view = self.volume.request_view()
+            key = view._cache_key('listdir', directory, True)
+            view._cache_delete(view._cache_key('stat', directory))
+            self.command.process(self.Event(directory.encode('utf-8'), mask | pyinotify.IN_ISDIR, maskname))
+            self.assertNotEqual(self.volume.request_view()._cache_key('listdir', directory, True), key)
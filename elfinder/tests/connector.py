@@ -4,6 +4,7 @@ from django.utils import unittest
 from elfinder.conf import settings as ls
 from elfinder.connector import ElfinderConnector
 from elfinder.exceptions import ElfinderErrorMessages
+from elfinder.utils.volumes import instantiate_driver
 
 class ConnectorInitTestCase(unittest.TestCase):
     
@@ -25,6 +26,66 @@ class ConnectorInitTestCase(unittest.TestCase):
         connector = ElfinderConnector(ls.ELFINDER_CONNECTOR_OPTION_SETS['default'])
         self.assertEqual(connector.loaded(), True)
         
+    def test_mount_once(self):
+        """
+        Test that roots are mounted once and each connector gets its own volume view
+        """
+        connector1 = ElfinderConnector(ls.ELFINDER_CONNECTOR_OPTION_SETS['default'])
+        connector2 = ElfinderConnector(ls.ELFINDER_CONNECTOR_OPTION_SETS['default'])
+        self.assertEqual(connector1.loaded(), True)
+        self.assertEqual(connector2.loaded(), True)
+        
+        volume1, volume2 = connector1._default, connector2._default
+        self.assertIsNot(volume1, volume2)
+        self.assertIs(volume1._attributes, volume2._attributes)
+        
+        #per-request state must not be shared
+        volume1.set_mimes_filter(['image'])
+        self.assertEqual(volume2._options['onlyMimes'], [])
+        volume1._removed.append({'hash' : 'dummy'})
+        self.assertEqual(volume2.removed(), [])
+
+    def test_mount_optionsets(self):
+        """
+        Test that roots sharing an id but not their other options are mounted once each
+        """
+        root1 = dict(ls.ELFINDER_CONNECTOR_OPTION_SETS['default']['roots'][0], id='shared')
+        root2 = dict(root1, onlyMimes=['image'])
+
+        volumes = [instantiate_driver(root) for root in [root1, root2, root1, root2]]
+        self.assertIs(volumes[0]._attribute_rules, volumes[2]._attribute_rules)
+        self.assertIs(volumes[1]._attribute_rules, volumes[3]._attribute_rules)
+        self.assertIsNot(volumes[0]._attribute_rules, volumes[1]._attribute_rules)
+        self.assertEqual(volumes[3]._options['onlyMimes'], ['image'])
+
+        #the order of dictionary keys does not matter
+        root3 = dict(reversed(root1.items()))
+        self.assertIs(instantiate_driver(root3)._attribute_rules, volumes[0]._attribute_rules)
+
+    def test_lazy_mount(self):
+        """
+        Test that volumes are mounted only when a command needs them
+        """
+        opts = { 'roots' : [ 
+            dict(ls.ELFINDER_CONNECTOR_OPTION_SETS['default']['roots'][0], id='lazy1'),
+            dict(ls.ELFINDER_CONNECTOR_OPTION_SETS['default']['roots'][0], id='lazy2')
+        ]}
+        
+        connector = ElfinderConnector(opts)
+        self.assertEqual(connector._volumes, {})
+        
+        #ls only touches the volume owning the target
+        self.assertNotIn('error', connector.execute('ls', target='llazy2_Lw'))
+        self.assertEqual(connector._volumes.keys(), ['llazy2_'])
+        
+        #unknown volume ids
+        self.assertIn('error', connector.execute('ls', target='llazy3_Lw'))
+        self.assertEqual(connector._volumes.keys(), ['llazy2_'])
+        
+        #search touches every root
+        connector.execute('search', q='dummy')
+        self.assertEqual(sorted(connector._volumes.keys()), ['llazy1_', 'llazy2_'])
+        
     def test_execute(self):
         """
         Test the execute method.
@@ -44,6 +105,38 @@ class ConnectorInitTestCase(unittest.TestCase):
         #test debug keyword
         self.assertEqual('debug' in connector.execute('open', init=True), False)
         self.assertEqual('debug' in connector.execute('open', init=True, debug=True), True)
+        
+    def test_workers(self):
+        """
+        Test that multi-target commands give the same results when run concurrently
+        """
+        root = dict(ls.ELFINDER_CONNECTOR_OPTION_SETS['default']['roots'][0], id='workers', path=settings.MEDIA_ROOT)
+        connector = ElfinderConnector({ 'roots' : [root], 'workers' : 4 })
+        self.assertEqual(connector.loaded(), True)
+        
+        volume = connector._default
+        dir_ = volume.encode(volume._join_path(settings.MEDIA_ROOT, 'files'))
+        names = ['workers%s' % i for i in range(5)]
+        targets = [connector.execute('mkfile', target=dir_, name=name)['added'][0]['hash'] for name in names]
+        try:
+            ret = connector.execute('info', targets=targets + ['dummy'])
+            self.assertEqual([f['name'] for f in ret['files']], names)
+            
+            ret = connector.execute('size', targets=targets + [volume.encode(os.path.join(settings.MEDIA_ROOT, 'files', '2bytes.txt'))])
+            self.assertEqual(ret['size'], 2)
+            self.assertIn('error', connector.execute('size', targets=targets + ['dummy']))
+            
+            ret = connector.execute('duplicate', targets=targets)
+            self.assertEqual([f['name'] for f in ret['added']], ['%s copy 1' % name for name in names])
+            targets += [f['hash'] for f in ret['added']]
+            
+            ret = connector.execute('rm', targets=targets + ['dummy'])
+            self.assertEqual(sorted(ret['removed']), sorted(targets))
+            self.assertEqual(ret['warning'], [ElfinderErrorMessages.ERROR_RM, '#dummy', ElfinderErrorMessages.ERROR_FILE_NOT_FOUND])
+        finally:
+            for name in os.listdir(os.path.join(settings.MEDIA_ROOT, 'files')):
+                if name.startswith('workers'):
+                    os.remove(os.path.join(settings.MEDIA_ROOT, 'files', name))
 
 class ConnectorEVLFOpen(unittest.TestCase):
     """
@@ -136,8 +229,19 @@ class ConnectorEVLFOpen(unittest.TestCase):
         self.assertEqual(ret_tree_debug['debug']['connector'], 'yawd-elfinder')
         self.assertEqual(ret_tree_debug['debug']['mountErrors'], [])
         self.assertEqual(ret_tree_debug['debug']['upload'], '')
-        self.assertEqual(ret_tree_debug['debug']['volumes'], [{'id': 'llff_', 'name': 'localfilesystem'}])
+        self.assertEqual(len(ret_tree_debug['debug']['volumes']), 1)
+        self.assertEqual(ret_tree_debug['debug']['volumes'][0]['id'], 'llff_')
+        self.assertEqual(ret_tree_debug['debug']['volumes'][0]['name'], 'localfilesystem')
         self.assertIsInstance(ret_tree_debug['debug']['time'], float)
+        self.assertEqual(sorted(ret_tree_debug['debug']['phases'].keys()), ['command', 'mount'])
+        
+        #the volume counters are kept per connector
+        counters = ret_tree_debug['debug']['volumes'][0]['counters']
+        self.assertGreater(counters['cacheGet'], 0)
+        #cache gets count requests, each one may fetch many keys
+        self.assertGreaterEqual(counters['cacheHit'] + counters['cacheMiss'], counters['cacheGet'])
+        self.assertEqual(counters, connector._default.debug()['counters'])
+        self.assertEqual(ElfinderConnector(self.opts).execute('open', target='dummy', init='1', debug='1')['debug']['volumes'][0]['counters']['fopen'], 0)
         
         del ret_tree_debug['debug']
         self.assertEqual(ret_tree, ret_tree_debug)
@@ -195,6 +299,7 @@ class ConnectorEVLFOpen(unittest.TestCase):
     def test_open_path(self):
         
         connector = ElfinderConnector(self.opts)
+        self.assertEqual(connector.loaded(), True)
         
         #************ init without tree ***********
         ret = connector.execute('open', target=connector._default.encode(
@@ -232,6 +337,60 @@ class ConnectorEVLFOpen(unittest.TestCase):
         self.assertEqual(ret['options']['separator'], os.sep)
         self.assertEqual(ret['options']['path'], '%s%sfiles%sdirectory' % (connector._default._root_name, os.sep, os.sep))
 
+    def test_open_page(self):
+        
+        connector = ElfinderConnector(self.opts)
+        self.assertEqual(connector.loaded(), True)
+        target = connector._default.encode(connector._default._join_path(settings.MEDIA_ROOT, 'files'))
+        
+        ret = connector.execute('open', target=target, limit='1')
+        self.assertEqual([f['name'] for f in ret['files']], ['2bytes.txt'])
+        self.assertIn('cursor', ret)
+        
+        ret = connector.execute('open', target=target, limit='1', cursor=ret['cursor'])
+        self.assertEqual([f['name'] for f in ret['files']], ['directory'])
+        self.assertNotIn('cursor', ret)
+        
+        ret = connector.execute('ls', target=target, sort='-name')
+        self.assertEqual(ret['list'], ['directory', '2bytes.txt'])
+        self.assertNotIn('cursor', ret)
+        
+        #invalid arguments
+        self.assertEqual(connector.execute('ls', target=target, sort='dummy')['error'], [ElfinderErrorMessages.ERROR_INV_PARAMS, 'ls'])
+        self.assertEqual(connector.execute('open', target=target, limit='dummy')['error'], [ElfinderErrorMessages.ERROR_INV_PARAMS, 'open'])
+        self.assertEqual(connector.execute('open', target=target, cursor='dummy')['error'], [ElfinderErrorMessages.ERROR_INV_PARAMS, 'open'])
+
+    def test_open_lazy_error(self):
+
+        connector = ElfinderConnector(self.opts, lazy=True)
+        self.assertEqual(connector.loaded(), True)
+        volume = connector._default
+        target = volume.encode(volume._join_path(settings.MEDIA_ROOT, 'files'))
+        self.assertEqual(sorted(connector.execute('ls', target=target)['list']), ['2bytes.txt', 'directory'])
+
+        #listing errors are reported before the lazy file list is returned
+        def scandir(path):
+            raise OSError('Storage unavailable')
+        volume.invalidate()
+        volume._scandir = scandir
+        self.assertEqual(connector.execute('open', target=target)['error'][0], ElfinderErrorMessages.ERROR_OPEN)
+        self.assertEqual(connector.execute('ls', target=target)['error'][0], ElfinderErrorMessages.ERROR_OPEN)
+
+    def test_open_fields(self):
+
+        connector = ElfinderConnector(self.opts)
+        self.assertEqual(connector.loaded(), True)
+        target = connector._default.encode(connector._default._root)
+        connector._default.invalidate()
+
+        ret = connector.execute('open', target=target, fields='tmb, dim')
+        self.assertNotIn('dirs', ret['cwd'])
+        self.assertEqual(connector._default._fields, frozenset(['tmb', 'dim']))
+
+        #the fields are reset by the next command
+        ret = connector.execute('open', target=target)
+        self.assertEqual(ret['cwd']['dirs'], 1)
+
         
     def check_root_tree(self, ret, len_, name):
         """
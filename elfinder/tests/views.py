@@ -0,0 +1,200 @@
+import os, json
+from django.conf import settings
+from django.test.client import RequestFactory
+from django.utils import unittest
+from elfinder.conf import settings as ls
+from elfinder.utils.volumes import instantiate_driver
+from elfinder.views import ElfinderConnectorView
+
+class ElfinderConnectorViewTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        settings.MEDIA_ROOT = os.path.join(os.path.dirname(__file__), 'media')
+        
+        self.root = ls.ELFINDER_CONNECTOR_OPTION_SETS['default']['roots'][0]
+        self.root['path'] = settings.MEDIA_ROOT
+        self.root['URL'] = settings.MEDIA_URL
+        
+        self.volume = instantiate_driver(self.root)
+        self.factory = RequestFactory()
+        
+    def get(self, method='get', headers={}, **params):
+        """
+        Perform a GET request to the connector view, using the default optionset
+        """
+        request = getattr(self.factory, method)('/', params, **headers)
+        request.session = {}
+        return ElfinderConnectorView.as_view()(request, optionset='default', start_path='default')
+    
+    def file_hash(self, *path):
+        return self.volume.encode(os.path.join(settings.MEDIA_ROOT, *path))
+    
+    def test_file_streaming(self):
+        """
+        Test that the file command streams the file contents
+        """
+        response = self.get(cmd='file', target=self.file_hash('files', '2bytes.txt'))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.streaming, True)
+        self.assertEqual(response['Content-Length'], '2')
+        self.assertEqual(''.join(response.streaming_content), '01')
+        
+        response = self.get(cmd='file', target=self.file_hash('files', 'dummy.txt'))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.streaming, False)
+
+    def test_file_sendfile(self):
+        """
+        Test that the file command lets the web server send files
+        """
+        self.root['sendFile'] = 'X-Accel-Redirect'
+        self.root['sendFilePrefix'] = '/protected'
+        try:
+            response = self.get(cmd='file', target=self.file_hash('files', '2bytes.txt'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Accel-Redirect'], '/protected/files/2bytes.txt')
+            self.assertEqual(response.content, '')
+            self.assertIn('Content-Disposition', response)
+            
+            self.root['sendFile'] = 'X-Sendfile'
+            response = self.get(cmd='file', target=self.file_hash('files', '2bytes.txt'))
+            self.assertEqual(response['X-Sendfile'], os.path.join(settings.MEDIA_ROOT, 'files', '2bytes.txt'))
+            self.assertEqual(response.content, '')
+        finally:
+            del self.root['sendFile']
+            del self.root['sendFilePrefix']
+
+    def test_file_conditional(self):
+        """
+        Test conditional GET and HEAD support for the file command
+        """
+        target = self.file_hash('files', '2bytes.txt')
+        response = self.get(cmd='file', target=target)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        
+        response = self.get(cmd='file', target=target, headers={'HTTP_IF_NONE_MATCH' : response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, '')
+        
+        response = self.get(cmd='file', target=target, headers={'HTTP_IF_NONE_MATCH' : '"dummy"'})
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.get(cmd='file', target=target, headers={'HTTP_IF_MODIFIED_SINCE' : response['Last-Modified']})
+        self.assertEqual(response.status_code, 304)
+        
+        response = self.get('head', cmd='file', target=target)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.streaming, False)
+        self.assertEqual(response.content, '')
+        self.assertEqual(response['Content-Length'], '2')
+        
+    def test_file_range(self):
+        """
+        Test single-range requests for the file command
+        """
+        target = self.file_hash('files', '2bytes.txt')
+        
+        response = self.get(cmd='file', target=target, headers={'HTTP_RANGE' : 'bytes=1-'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 1-1/2')
+        self.assertEqual(response['Content-Length'], '1')
+        self.assertEqual(''.join(response.streaming_content), '1')
+        
+        response = self.get(cmd='file', target=target, headers={'HTTP_RANGE' : 'bytes=-5'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(''.join(response.streaming_content), '01')
+        
+        response = self.get(cmd='file', target=target, headers={'HTTP_RANGE' : 'bytes=2-3'})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */2')
+        
+        #multiple ranges are not supported
+        response = self.get(cmd='file', target=target, headers={'HTTP_RANGE' : 'bytes=0-0,1-1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(''.join(response.streaming_content), '01')
+        
+        #If-Range mismatch
+        response = self.get(cmd='file', target=target, headers={'HTTP_RANGE' : 'bytes=1-', 'HTTP_IF_RANGE' : '"dummy"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_batch(self):
+        """
+        Test executing many commands in a single request
+        """
+        directory = self.file_hash('files', 'directory')
+        commands = [
+            {'cmd' : 'ls', 'target' : self.file_hash('files')},
+            {'cmd' : 'size', 'targets' : [directory]},
+            {'cmd' : 'file', 'target' : self.file_hash('files', '2bytes.txt')},
+            {'cmd' : 'ls', 'target' : self.file_hash('files'), 'mimes' : ['image']},
+            {'cmd' : 'ls', 'target' : self.file_hash('files')},
+            {'cmd' : 'dummy'},
+            {'cmd' : 'ls'}
+        ]
+        
+        for method in ['get', 'post']:
+            response = self.get(method, cmd='batch', commands=json.dumps(commands))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            
+            results = json.loads(response.content)
+            self.assertEqual(len(results), len(commands))
+            self.assertEqual(sorted(results[0]['list']), ['2bytes.txt', 'directory'])
+            self.assertIn('size', results[1])
+            self.assertEqual(results[2]['error'], ['errUnknownCmd', 'file'])
+            self.assertEqual(results[3]['list'], ['directory'])
+            #the mime filter must not leak to the following commands
+            self.assertEqual(sorted(results[4]['list']), ['2bytes.txt', 'directory'])
+            self.assertEqual(results[5]['error'], ['errUnknownCmd', 'dummy'])
+            self.assertEqual(results[6]['error'], ['errCmdParams', 'ls'])
+        
+        response = self.get(cmd='batch', commands='dummy')
+        self.assertEqual(json.loads(response.content)['error'], ['errCmdParams', 'batch'])
+
+    def test_json_streaming(self):
+        """
+        Test that large file lists are streamed to the client
+        """
+        target = self.file_hash('files')
+        
+        response = self.get(cmd='open', target=target, tree=1)
+        self.assertEqual(response.streaming, True)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        result = json.loads(''.join(response.streaming_content))
+        self.assertEqual(result['cwd']['hash'], target)
+        hashes = [f['hash'] for f in result['files']]
+        self.assertEqual(len(hashes), len(set(hashes)))
+        self.assertIn(self.file_hash('files', '2bytes.txt'), hashes)
+        self.assertIn(self.file_hash('files', 'directory'), hashes)
+        
+        response = self.get(cmd='ls', target=target)
+        self.assertEqual(response.streaming, True)
+        self.assertEqual(sorted(json.loads(''.join(response.streaming_content))['list']), ['2bytes.txt', 'directory'])
+        
+        response = self.get(cmd='search', q='2bytes')
+        self.assertEqual(response.streaming, True)
+        self.assertEqual([f['name'] for f in json.loads(''.join(response.streaming_content))['files']], ['2bytes.txt'])
+        
+        #errors are not streamed
+        response = self.get(cmd='ls', target='dummy')
+        self.assertEqual(response.streaming, False)
+        self.assertIn('error', json.loads(response.content))
+
+    def test_debug(self):
+        """
+        Test that the debug info reports the serialization time and counters
+        """
+        target = self.file_hash('files')
+        
+        for cmd in ['open', 'tree']:
+            response = self.get(cmd=cmd, target=target, debug=1)
+            content = ''.join(response.streaming_content) if response.streaming else response.content
+            debug = json.loads(content)['debug']
+            self.assertEqual(sorted(debug['phases'].keys()), ['command', 'mount', 'serialization'])
+            #debug info is encoded last
+            self.assertGreater(content.index('"debug": '), content.index('"%s": ' % ('files' if cmd == 'open' else 'tree')))
+            self.assertIn('stat', debug['volumes'][0]['counters'])
+            self.assertIn('bytesRead', debug['volumes'][0]['counters'])
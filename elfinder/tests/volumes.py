@@ -1,8 +1,14 @@
-import os, re
+import os, re, shutil, time, json, pickle, tempfile, sqlite3
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import unittest
 from elfinder.volumes.filesystem import ElfinderVolumeLocalFileSystem
 from elfinder.volumes.storage import ElfinderVolumeStorage
+from elfinder.exceptions import FileNotFoundError
+from elfinder.utils.accesscontrol import fs_standard_access_batch
+from elfinder.utils.lru import LRUCache
+from elfinder.utils.pathindex import PathIndex
+from elfinder.utils.stat import ElfinderStat, OPTIONAL_FIELDS, json_default
 
 class ElfinderVolumeLocalFileSystemTestCase(unittest.TestCase):
     volume_class = ElfinderVolumeLocalFileSystem
@@ -151,6 +157,473 @@ class ElfinderVolumeLocalFileSystemTestCase(unittest.TestCase):
         stat = self.driver.stat(self.driver._join_path(self.options['path'], 'files'))
         self.assertEqual(stat['hidden'], 0)
         
+    def test_stat_many(self):
+        path = self.driver._join_path(self.options['path'], 'files')
+        paths = self.driver._get_cached_dir(path)
+        
+        stats = self.driver.stat_many(paths + [self.driver._join_path(path, 'dummy')])
+        self.assertEqual(sorted(stats.keys()), sorted(paths))
+        for p in paths:
+            self.assertEqual(stats[p], self.driver.stat(p))
+        
+        #a cached directory listing fetches all file stats with a single request
+        #(plus the generation, the directory token and the directory stat and listing)
+        view = self.driver.request_view()
+        list(view._iter_scandir(path))
+        self.assertEqual(view.debug()['counters']['stat'], 0)
+        self.assertEqual(view.debug()['counters']['cacheGet'], 4)
+    
+    def test_invalidate(self):
+        path = self.driver._join_path(self.options['path'], 'files')
+        self.driver.stat(path)
+        
+        view = self.driver.request_view()
+        view.stat(path)
+        self.assertEqual(view.debug()['counters']['stat'], 0)
+        
+        #a view fetches the generation once
+        gets = view.debug()['counters']['cacheGet']
+        view.stat(path)
+        self.assertEqual(view.debug()['counters']['cacheGet'], gets + 1)
+        
+        view.invalidate()
+        view.stat(path)
+        self.assertEqual(view.debug()['counters']['stat'], 1)
+        
+        #other views see the new generation
+        view = self.driver.request_view()
+        view.stat(path)
+        self.assertEqual(view.debug()['counters']['stat'], 0)
+    
+    def test_page(self):
+        path = self.driver._join_path(self.options['path'], 'files')
+        enc_path = self.driver.encode(path)
+        names = ['page_a', 'page_b', 'page_c']
+        
+        for name in names:
+            self.driver.mkfile(enc_path, name)
+        try:
+            files, cursor = self.driver.page(enc_path, 2)
+            self.assertEqual([f['name'] for f in files], ['2bytes.txt', 'page_a'])
+            files, cursor = self.driver.page(enc_path, 2, cursor)
+            self.assertEqual([f['name'] for f in files], ['page_b', 'page_c'])
+            self.assertEqual(cursor, None)
+            
+            #the hidden directory is skipped
+            files, cursor = self.driver.page(enc_path, 3, sort='-name')
+            self.assertEqual([f['name'] for f in files], ['page_c', 'page_b', 'page_a'])
+            files, cursor = self.driver.page(enc_path, 3, cursor, '-name')
+            self.assertEqual([f['name'] for f in files], ['2bytes.txt'])
+            self.assertEqual(cursor, None)
+            
+            files, cursor = self.driver.page(enc_path, sort='size')
+            self.assertEqual([f['name'] for f in files], ['page_a', 'page_b', 'page_c', '2bytes.txt'])
+            
+            self.assertRaises(ValueError, self.driver.page, enc_path, sort='dummy')
+            self.assertRaises(ValueError, self.driver.page, enc_path, 2, cursor='dummy')
+            self.assertRaises(ValueError, self.driver.page, enc_path, 2, self.driver.page(enc_path, 1)[1], 'ts')
+        finally:
+            for name in names:
+                self.driver.rm(self.driver.encode(self.driver._join_path(path, name)))
+    
+    def test_rename_subtree(self):
+        path = self.driver._join_path(self.options['path'], 'files')
+        dir_ = self.driver._join_path(path, 'subtree')
+        child = self.driver._join_path(dir_, 'child.txt')
+        
+        self.driver.mkdir(self.driver.encode(path), 'subtree')
+        try:
+            self.driver.mkfile(self.driver.encode(dir_), 'child.txt')
+            self.driver.stat(child)
+            stat_key = self.driver._cache_key('stat', child)
+            dir_key = self.driver._cache_key('listdir', dir_, True)
+            sibling_key = self.driver._cache_key('stat', self.driver._join_path(path, '2bytes.txt'))
+            
+            self.driver.rename(self.driver.encode(dir_), 'subtree2')
+            
+            #keys of the whole subtree change, siblings are not affected
+            view = self.driver.request_view()
+            self.assertNotEqual(view._cache_key('stat', child), stat_key)
+            self.assertNotEqual(view._cache_key('listdir', dir_, True), dir_key)
+            self.assertEqual(view._cache_key('stat', self.driver._join_path(path, '2bytes.txt')), sibling_key)
+            self.assertRaises(os.error, view.stat, child)
+        finally:
+            for name in ['subtree', 'subtree2']:
+                if os.path.isdir(os.path.join(path, name)):
+                    shutil.rmtree(os.path.join(path, name))
+    
+    def test_cache_stampede(self):
+        path = self.driver._join_path(self.driver._join_path(self.options['path'], 'files'), '2bytes.txt')
+        view = self.driver.request_view()
+        key = view._cache_key('stat', path)
+        stat = view.stat(path)
+        
+        #expired values are served while another request rebuilds them
+        cache.set(key, (time.time() - 1, {'name' : 'stale'}), 60)
+        self.assertTrue(view._cache_lock(key))
+        try:
+            self.assertEqual(view.stat(path), {'name' : 'stale'})
+            self.assertEqual(view.stat_many([path]), {path : {'name' : 'stale'}})
+            self.assertEqual(view.debug()['counters']['cacheStaleHit'], 2)
+            
+            #missing stats are cheap to build and are not waited for
+            view._options['cacheWait'] = 0.1
+            cache.delete(key)
+            self.assertEqual(view.stat(path), stat)
+            self.assertEqual(view.debug()['counters']['cacheWait'], 0)
+        finally:
+            view._cache_unlock(key)
+        
+        cache.set(key, (time.time() - 1, {'name' : 'stale'}), 60)
+        self.assertEqual(view.stat(path), stat)
+        self.assertEqual(view.request_view().stat(path), stat)
+        
+        #missing directory listings are waited for, then built
+        dir_ = view._dirname(path)
+        dir_key = view._cache_key('listdir', dir_, True)
+        listing = view._get_cached_dir(dir_)
+        cache.delete(dir_key)
+        self.assertTrue(view._cache_lock(dir_key))
+        try:
+            self.assertEqual(view._get_cached_dir(dir_), listing)
+            self.assertEqual(view.debug()['counters']['cacheWait'], 1)
+        finally:
+            view._cache_unlock(dir_key)
+        
+        #a missing path costs a single cache request
+        view._reset_counters()
+        self.assertRaises(os.error, view.stat, view._join_path(dir_, 'dummy'))
+        counters = view.debug()['counters']
+        self.assertEqual((counters['cacheGet'], counters['cacheLock'], counters['cacheDelete']), (1, 0, 0))
+        
+        #an expired listing is rebuilt under a single lock
+        view = view.request_view()
+        listing = view._get_cached_dir(dir_)
+        stats = view.stat_many(listing)
+        cache.set_many(dict((view._cache_key('stat', p), (time.time() - 1, stat)) for p, stat in stats.items()), 60)
+        view._reset_counters()
+        self.assertEqual(view.stat_many(listing), stats)
+        counters = view.debug()['counters']
+        self.assertEqual((counters['cacheGet'], counters['cacheLock'], counters['cacheSet'], counters['cacheDelete']), (1, 1, 1, 1))
+        self.assertEqual(counters.get('cacheStaleHit', 0), 0)
+    
+    def test_cache_validate(self):
+        if not 'cacheValidate' in self.driver._options:
+            self.skipTest('%s does not validate cached directories' % self.volume_class.__name__)
+        
+        self.driver._options['cacheValidate'] = True
+        path = self.driver._join_path(self.options['path'], 'files')
+        subdir = self.driver._join_path(path, 'directory')
+        new = os.path.join(path, 'external.txt')
+        self.assertNotIn(new, self.driver._get_cached_dir(path))
+        self.driver.stat_many(self.driver._get_cached_dir(subdir))
+        
+        #files added by other applications are noticed
+        open(new, 'w').close()
+        try:
+            st = os.stat(path)
+            os.utime(path, (st.st_atime, st.st_mtime + 10))
+            view = self.driver.request_view()
+            self.assertIn(new, view._get_cached_dir(path))
+            self.assertEqual(view.debug()['counters']['scandir'], 1)
+            
+            #the cached data of deeper descendants is kept
+            view = self.driver.request_view()
+            self.assertIn(new, view._get_cached_dir(path))
+            view.stat_many(view._get_cached_dir(subdir))
+            self.assertEqual(view.debug()['counters']['scandir'], 0)
+            self.assertEqual(view.debug()['counters']['stat'], 0)
+        finally:
+            os.remove(new)
+    
+    def test_stat_record(self):
+        path = self.driver._join_path(self.driver._join_path(self.options['path'], 'files'), '2bytes.txt')
+        stat = self.driver.stat(path)
+        self.assertIsInstance(stat, ElfinderStat)
+        self.assertEqual(stat['name'], '2bytes.txt')
+        self.assertEqual(stat.get('dirs'), None)
+        self.assertNotIn('dirs', stat)
+        
+        #records are pickled as tuples, extra keys are kept
+        stat['realpath'] = path
+        data = pickle.dumps(stat, pickle.HIGHEST_PROTOCOL)
+        self.assertLess(len(data), len(pickle.dumps(stat.as_dict(), pickle.HIGHEST_PROTOCOL)))
+        self.assertEqual(pickle.loads(data), stat)
+        self.assertEqual(pickle.loads(data)['realpath'], path)
+        
+        del stat['realpath']
+        self.assertEqual(json.loads(json.dumps(stat, default=json_default)), stat.as_dict())
+    
+    def test_mimes_filter(self):
+        path = self.driver._join_path(self.options['path'], 'files')
+        file_ = self.driver._join_path(path, '2bytes.txt')
+        
+        self.driver.set_mimes_filter(['image'])
+        self.assertNotIn('2bytes.txt', [f['name'] for f in self.driver.scandir(self.driver.encode(path))])
+        self.assertNotIn('2bytes.txt', self.driver.ls(self.driver.encode(path)))
+        self.assertEqual(self.driver.stat(file_)['hidden'], 0)
+        
+        #cached stats do not depend on the filter
+        view = self.driver.request_view()
+        view.set_mimes_filter(None)
+        self.assertIn('2bytes.txt', [f['name'] for f in view.scandir(self.driver.encode(path))])
+        self.assertEqual(view.debug()['counters']['stat'], 0)
+    
+    def test_cache_pack(self):
+        path = self.driver._join_path(self.options['path'], 'files')
+        listing = self.driver._get_cached_dir(path)
+        
+        self.driver.invalidate()
+        self.driver._options['cacheCompress'] = 1
+        self.driver._options['cacheChunkSize'] = 50
+        key = self.driver._cache_key('listdir', path, True)
+        self.assertEqual(self.driver._get_cached_dir(path), listing)
+        
+        #large values are compressed and split in parts
+        packed = cache.get(key)[1]
+        self.assertTrue(packed.compressed)
+        self.assertGreater(len(packed.parts), 1)
+        
+        view = self.driver.request_view()
+        self.assertEqual(view._get_cached_dir(path), listing)
+        self.assertEqual(view.debug()['counters']['scandir'], 0)
+        
+        #a missing part is a cache miss
+        cache.delete(packed.parts[-1])
+        view = self.driver.request_view()
+        self.assertEqual(view._get_cached_dir(path), listing)
+        self.assertEqual(view.debug()['counters']['scandir'], 1)
+        
+        #stat records are not packed
+        self.driver.stat(path)
+        self.assertIsInstance(cache.get(self.driver._cache_key('stat', path))[1], ElfinderStat)
+    
+    def test_access_control_batch(self):
+        path = self.driver._join_path(self.options['path'], 'files')
+        file_ = self.driver._join_path(path, '2bytes.txt')
+        calls = []
+        
+        def batch(dir_, paths, volume):
+            calls.append((dir_, sorted(paths)))
+            return { file_ : { 'hidden' : True } }
+        
+        def access(attr, path, volume):
+            calls.append((attr, path))
+        
+        self.driver._options['accessControlBatch'] = batch
+        self.driver._options['accessControl'] = access
+        self.driver.invalidate()
+        view = self.driver.request_view()
+        
+        self.assertNotIn('2bytes.txt', [f['name'] for f in view.scandir(self.driver.encode(path))])
+        #paths whose attributes are already known are left out
+        batches = [c for c in calls if isinstance(c[1], list)]
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(batches[0][0], path)
+        self.assertIn(file_, batches[0][1])
+        self.assertNotIn(('hidden', file_), calls)
+        #other attributes fall back to the accessControl callable
+        self.assertIn(('read', file_), calls)
+        
+        #stats completed with more fields are batched too
+        self.driver._options['accessControlBatch'] = lambda dir_, paths, volume: dict((p, { 'read' : True, 'write' : True, 'hidden' : False, 'locked' : False }) for p in paths)
+        self.driver.invalidate()
+        view = self.driver.request_view()
+        view.set_fields(['tmb'])
+        listing = view._get_cached_dir(path)
+        view.stat_many(listing)
+        del calls[:]
+        view = self.driver.request_view()
+        self.assertEqual(sorted(view.stat_many(listing)), sorted(listing))
+        self.assertEqual(calls, [])
+        
+        #paths the batch does not decide on fall back to the accessControl callable
+        self.driver._options['accessControlBatch'] = fs_standard_access_batch
+        view = self.driver.request_view()
+        view._batch_attrs([file_])
+        view._attrs(file_)
+        self.assertIn(('read', file_), calls)
+    
+    def test_hash_memo(self):
+        path = self.driver._join_path(self.driver._join_path(self.options['path'], 'files'), '2bytes.txt')
+        hash_ = self.driver.encode(path)
+        self.assertEqual(hash_, self.driver._encode(path))
+        self.assertIs(self.driver.encode(path), hash_)
+        self.assertEqual(self.driver.decode(hash_), path)
+        self.assertIs(self.driver.decode(hash_), self.driver.decode(hash_))
+        self.assertRaises(FileNotFoundError, self.driver.decode, 'dummy')
+        
+        #cache keys have a fixed length
+        deep = self.driver._join_path(self.options['path'], os.sep.join(['directory'] * 50))
+        self.assertEqual(len(self.driver._cache_key('stat', deep)), len(self.driver._cache_key('stat', path)))
+        
+        lru = LRUCache(2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual([lru.get(k) for k in 'abc'], [1, None, 3])
+    
+    def test_path_index(self):
+        tmp = tempfile.mkdtemp()
+        driver = self.volume_class()
+        driver.mount(dict(self.options, id='index', pathIndex=os.path.join(tmp, 'index.sqlite')))
+        
+        path = driver._join_path(self.options['path'], 'files')
+        dir_ = driver._join_path(path, 'indexed')
+        child = driver._join_path(dir_, 'child.txt')
+        try:
+            driver.mkdir(driver.encode(path), 'indexed')
+            driver.mkfile(driver.encode(dir_), 'child.txt')
+            hash_ = driver.encode(child)
+            self.assertLess(len(hash_), len(self.driver.encode(child)))
+            self.assertEqual(driver.decode(hash_), child)
+            
+            #ids are kept when moving files
+            driver.rename(driver.encode(dir_), 'indexed2')
+            moved = driver._join_path(driver._join_path(path, 'indexed2'), 'child.txt')
+            self.assertEqual(driver.encode(moved), hash_)
+            self.assertEqual(driver.request_view().decode(hash_), moved)
+            self.assertEqual(driver.stat(moved)['hash'], hash_)
+            
+            driver.rm(driver.encode(moved))
+            self.assertRaises(FileNotFoundError, driver.decode, hash_)
+            self.assertNotEqual(driver.encode(moved), hash_)
+            
+            #listings are indexed in a single transaction
+            listing = driver._get_cached_dir(path)
+            view = driver.request_view()
+            view._path_index = index = PathIndex(os.path.join(tmp, 'index.sqlite'))
+            calls = []
+            index.id = lambda p: calls.append(p)
+            stats = view.stat_many(listing)
+            self.assertEqual(calls, [])
+            self.assertEqual([stats[p]['hash'] for p in listing], [driver.encode(p) for p in listing])
+            self.assertEqual(index.ids([u'files', u'dummy'])[u'files'], index.ids([u'files'])[u'files'])
+            
+            #byte string paths
+            self.assertEqual(driver.decode(driver.encode(driver._join_path(path, 'caf\xc3\xa9'))), driver._join_path(path, u'caf\xe9'))
+        finally:
+            for name in ['indexed', 'indexed2']:
+                if os.path.isdir(os.path.join(path, name)):
+                    shutil.rmtree(os.path.join(path, name))
+            shutil.rmtree(tmp)
+    
+    def test_path_index_probes(self):
+        tmp = tempfile.mkdtemp()
+        index = os.path.join(tmp, 'index.sqlite')
+        #storage volumes are confined to the media root
+        root = tempfile.mkdtemp(dir=settings.MEDIA_ROOT)
+        for i in range(5):
+            shutil.copy(os.path.join(settings.MEDIA_ROOT, 'files', 'directory', 'yawd-logo.png'), os.path.join(root, '%s.png' % i))
+        
+        def rows():
+            connection = sqlite3.connect(index)
+            try:
+                return connection.execute('SELECT COUNT(*) FROM paths').fetchone()[0]
+            finally:
+                connection.close()
+        
+        try:
+            driver = self.volume_class()
+            driver.mount({ 'id' : 'probes', 'path' : root, 'tmbURL' : 'http://example.com/files', 'pathIndex' : index })
+            listing = driver._get_cached_dir(driver._root)
+            
+            #only the root and the listed files get ids, not the thumbnails probed for
+            self.assertEqual(len(driver.request_view().scandir(driver.encode(driver._root))), 5)
+            count = rows()
+            self.assertEqual(count, len(listing) + 1)
+            
+            driver.invalidate()
+            view = driver.request_view()
+            view.scandir(view.encode(view._root))
+            self.assertRaises(os.error, view.stat, view._join_path(view._root, 'dummy.png'))
+            self.assertEqual(rows(), count)
+        finally:
+            shutil.rmtree(root)
+            shutil.rmtree(tmp)
+    
+    def test_fields(self):
+        path = self.realPath
+        self.driver.invalidate()
+        
+        view = self.driver.request_view()
+        view.set_fields(['tmb', 'dim', 'dummy'])
+        stat = view.stat(path)
+        self.assertNotIn('dirs', stat)
+        self.assertEqual(stat.fields, frozenset(['tmb', 'dim']))
+        
+        #stats lacking requested fields are completed and cached again
+        view = self.driver.request_view()
+        self.assertEqual(view.stat(path)['dirs'], 1)
+        self.assertEqual(view.debug()['counters']['stat'], 1)
+        
+        view = self.driver.request_view()
+        view.set_fields([])
+        self.assertEqual(view.stat(path)['dirs'], 1)
+        self.assertEqual(view.debug()['counters']['stat'], 0)
+        
+        self.driver.set_fields(None)
+        self.assertEqual(self.driver._fields, frozenset(OPTIONAL_FIELDS))
+        
+    def test_size_hidden(self):
+        root = tempfile.mkdtemp(dir=settings.MEDIA_ROOT)
+        try:
+            with open(os.path.join(root, 'visible.txt'), 'w') as fp:
+                fp.write('x' * 5)
+            with open(os.path.join(root, '.secret'), 'w') as fp:
+                fp.write('x' * 1000)
+            
+            driver = self.volume_class()
+            driver.mount({ 'id' : 'sizeHidden', 'path' : root, 'attributes' : [{ 'pattern' : r'\.secret$', 'hidden' : True }] })
+            self.assertEqual(driver.size(driver.encode(driver._root)), 5)
+        finally:
+            shutil.rmtree(root)
+    
+    def test_size_options(self):
+        self.driver.invalidate()
+        view = self.driver.request_view()
+        view._options['checkSubfolders'] = False
+        options = []
+        subdirs = view._subdirs
+        def _subdirs(path):
+            options.append(view._options['checkSubfolders'])
+            return subdirs(path)
+        view._subdirs = _subdirs
+        
+        #subfolders are checked without changing the options shared by concurrent targets
+        self.assertGreater(view.size(self.default_path), 0)
+        self.assertTrue(options)
+        self.assertEqual(set(options), set([False]))
+        self.assertEqual(view._options['checkSubfolders'], False)
+    
+    def test_changed(self):
+        path = self.driver._join_path(self.options['path'], 'files')
+        new = self.driver._join_path(path, 'external')
+        self.driver._get_cached_dir(path)
+        self.driver.stat(path)
+        
+        os.mkdir(os.path.join(settings.MEDIA_ROOT, 'files', 'external'))
+        try:
+            self.driver.changed(new)
+            self.assertIn(new, self.driver._get_cached_dir(path))
+            self.assertEqual(self.driver.stat(new)['mime'], 'directory')
+            
+            os.rmdir(os.path.join(settings.MEDIA_ROOT, 'files', 'external'))
+            key = self.driver._cache_key('listdir', new, True)
+            self.driver.changed(new, True)
+            self.assertNotIn(new, self.driver._get_cached_dir(path))
+            self.assertNotEqual(self.driver._cache_key('listdir', new, True), key)
+            
+            #the cached stat of a removed directory may have been evicted
+            key = self.driver._cache_key('listdir', new, True)
+            self.assertIsNone(self.driver._cached_stat(new))
+            self.driver.changed(new, True, True)
+            self.assertNotEqual(self.driver._cache_key('listdir', new, True), key)
+        finally:
+            if os.path.isdir(os.path.join(settings.MEDIA_ROOT, 'files', 'external')):
+                os.rmdir(os.path.join(settings.MEDIA_ROOT, 'files', 'external'))
+    
     def tearDown(self):
         self.driver.reset_removed()
 
@@ -182,6 +655,25 @@ class ElfinderVolumeLocalFileSystemThumbnailTestCase(unittest.TestCase):
         self.assertIn('archivers', options)
         self.assertIn('disabled', options)
         self.assertIn('copyOverwrite', options)
+    
+    def test_rm_tmb(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            shutil.copy(os.path.join(settings.MEDIA_ROOT, 'files', 'directory', 'yawd-logo.png'), tmp)
+            driver = self.volume_class()
+            driver.mount({ 'id' : 'tmbRm', 'path' : tmp, 'tmbURL' : 'http://example.com/files' })
+            
+            #thumbnails of files stat'ed without the tmb field are removed as well
+            driver.set_fields([])
+            stat = driver.stat(driver._join_path(driver._root, 'yawd-logo.png'))
+            self.assertNotIn('tmb', stat)
+            tmb = os.path.join(driver._options['tmbPath'], driver._tmb_name(stat))
+            open(tmb, 'w').close()
+            
+            driver.rm(stat['hash'])
+            self.assertFalse(os.path.exists(tmb))
+        finally:
+            shutil.rmtree(tmp)
 
 class ElfinderVolumeStorageTestCase(ElfinderVolumeLocalFileSystemTestCase):
     volume_class = ElfinderVolumeStorage
@@ -229,4 +721,25 @@ class ElfinderVolumeFilePermissionTestcase(unittest.TestCase):
     
     def test_locked(self):
         
-        self.assertEqual(self.driver._attr(self.root, 'locked'), True)
\ No newline at end of file
+        self.assertEqual(self.driver._attr(self.root, 'locked'), True)
+    
+    def test_attrs(self):
+        path = '%(root)s%(sep)sa%(sep)stmp%(sep)sc' % {'root': self.root, 'sep':os.sep}
+        self.assertEqual(self.driver._attrs(path), {'read' : True, 'write' : False, 'locked' : True, 'hidden' : True})
+        self.assertEqual(self.driver._attrs(self.root)['read'], None)
+        
+        #the access control callable is called once per attribute and request
+        calls = []
+        def access(attr, path, volume):
+            calls.append(attr)
+            return False if attr == 'write' else None
+        
+        self.driver._options['accessControl'] = access
+        view = self.driver.request_view()
+        self.assertEqual(view._attr(path, 'write'), False)
+        self.assertEqual(view._attr(path, 'read'), True)
+        self.assertEqual(view._attr(path, 'hidden'), True)
+        self.assertEqual(sorted(calls), ['hidden', 'locked', 'read', 'write'])
+        
+        view.request_view()._attr(path, 'read')
+        self.assertEqual(len(calls), 8)
\ No newline at end of file
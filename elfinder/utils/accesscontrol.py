@@ -26,3 +26,34 @@ def fs_standard_access(attr, path, volume):
             return False
         elif attr in ['hidden', 'locked'] and os.path.basename(path).startswith('.'):
             return True
+
+def fs_standard_access_batch(path, paths, volume):
+    """
+    Apply the :func:`fs_standard_access` rules to many files of the same
+    directory at once. This can be used in the
+    :ref:`setting-accessControlBatch` setting; a callable that reads
+    permissions from a database would fetch those of all ``paths`` with
+    a single query instead.
+
+    Args:
+        :path: The parent directory of ``paths``.
+        :paths: The paths to check against.
+        :volume: The volume responsible for managing the paths.
+
+    Returns:
+        A dictionary mapping each path to a dictionary of its `read`,
+        `write`, `hidden` and `locked` permissions. Paths or permissions
+        missing from the result are checked by the 
+        :ref:`setting-accessControl` callable and the default permission
+        rules.
+    """
+    result = {}
+    if volume.name() != 'localfilesystem':
+        return result
+    
+    for p in paths:
+        name = os.path.basename(p)
+        #keep reserved folder names intact
+        if name.startswith('.') and not name in ['.tmb', '.quarantine']:
+            result[p] = { 'read' : False, 'write' : False, 'hidden' : True, 'locked' : True }
+    return result
@@ -0,0 +1,81 @@
+import re
+from hashlib import md5
+from django.utils.http import parse_etags, quote_etag, parse_http_date_safe
+
+_RANGE_RE = re.compile(r'^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$', re.IGNORECASE)
+
+class RangeNotSatisfiable(Exception):
+    """
+    Raised when a ``Range`` header cannot be satisfied for the file size.
+    """
+    pass
+
+def file_etag(stat):
+    """
+    Return a quoted ETag for a file, based on its ``hash``, ``ts`` and
+    ``size`` stat attributes.
+    """
+    return quote_etag(md5('%s:%s:%s' % (stat['hash'], stat['ts'], stat['size'])).hexdigest())
+
+def not_modified(request, etag, ts):
+    """
+    Return ``True`` if the conditional headers of ``request``
+    (``If-None-Match`` or ``If-Modified-Since``) match the file
+    ``etag`` or modification time ``ts``.
+    """
+    if not request or not hasattr(request, 'META'):
+        return False
+
+    if 'HTTP_IF_NONE_MATCH' in request.META:
+        value = request.META['HTTP_IF_NONE_MATCH']
+        return value.strip() == '*' or etag in [quote_etag(e) for e in parse_etags(value)]
+
+    if 'HTTP_IF_MODIFIED_SINCE' in request.META:
+        since = parse_http_date_safe(request.META['HTTP_IF_MODIFIED_SINCE'])
+        try:
+            return since is not None and int(ts) <= since
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+def requested_range(request, size, etag, last_modified=None):
+    """
+    Return the ``(start, end)`` byte positions (both inclusive) requested
+    by a single-range ``Range`` header, or ``None`` if the whole file must
+    be sent. Multiple ranges are not supported and are ignored, as
+    are ranges whose ``If-Range`` validator does not match ``etag`` or
+    ``last_modified``.
+
+    Raises ``RangeNotSatisfiable`` if the range lies outside the file.
+    """
+    if not request or not hasattr(request, 'META') or not 'HTTP_RANGE' in request.META:
+        return None
+
+    if not isinstance(size, (int, long)) or size <= 0:
+        return None
+
+    if 'HTTP_IF_RANGE' in request.META:
+        validator = request.META['HTTP_IF_RANGE'].strip()
+        if validator != etag and (not last_modified or validator != last_modified):
+            return None
+
+    m = _RANGE_RE.match(request.META['HTTP_RANGE'])
+    if not m or (not m.group(1) and not m.group(2)):
+        return None
+
+    if not m.group(1): #suffix range, i.e. the last N bytes
+        length = int(m.group(2))
+        if not length:
+            raise RangeNotSatisfiable
+        return (max(size - length, 0), size - 1)
+
+    start = int(m.group(1))
+    end = int(m.group(2)) if m.group(2) else size - 1
+
+    if start >= size:
+        raise RangeNotSatisfiable
+    if end < start:
+        return None
+
+    return (start, min(end, size - 1))
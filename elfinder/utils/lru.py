@@ -0,0 +1,46 @@
+import threading
+from collections import OrderedDict
+
+class LRUCache(object):
+    """
+    A thread-safe mapping that holds at most ``size`` items. When full,
+    the least recently used item is discarded to make room for a new one.
+    """
+    
+    def __init__(self, size):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        
+    def get(self, key, default=None):
+        """
+        Return the value of ``key``, or ``default`` if it is not cached.
+        """
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return default
+            #move to the most recently used end
+            self._data[key] = value
+            return value
+    
+    def set(self, key, value):
+        """
+        Cache ``value`` under ``key``.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            if len(self._data) > self.size:
+                self._data.popitem(last=False)
+    
+    def clear(self):
+        """
+        Discard all items.
+        """
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,114 @@
+import sqlite3, threading
+
+_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+#Paths per query, below the SQLite limit of 999 parameters
+_BATCH_SIZE = 500
+
+class PathIndex(object):
+    """
+    A persistent index assigning short, stable ids to paths, stored in an
+    SQLite database. Ids are strings of base 36 digits. They never change
+    when paths are moved through
+    :func:`elfinder.utils.pathindex.PathIndex.move`, and the ids of removed
+    paths are never reused. Each thread uses its own database connection.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._local = threading.local()
+        self._connection().execute('CREATE TABLE IF NOT EXISTS paths (id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL UNIQUE)')
+        self._connection().commit()
+
+    def _connection(self):
+        """
+        Return the database connection of the current thread.
+        """
+        if not hasattr(self._local, 'connection'):
+            self._local.connection = sqlite3.connect(self.filename, timeout=30)
+        return self._local.connection
+
+    def id(self, path):
+        """
+        Return the id of ``path``, assigning a new one if it has none.
+        """
+        connection = self._connection()
+        row = connection.execute('SELECT id FROM paths WHERE path = ?', (path,)).fetchone()
+        if row is None:
+            #another process may insert the same path concurrently
+            connection.execute('INSERT OR IGNORE INTO paths (path) VALUES (?)', (path,))
+            connection.commit()
+            row = connection.execute('SELECT id FROM paths WHERE path = ?', (path,)).fetchone()
+        return _base36(row[0])
+
+    def ids(self, paths):
+        """
+        Return a dictionary mapping each one of ``paths`` to its id. Paths
+        that have no id are assigned new ones in a single transaction.
+        """
+        connection = self._connection()
+        ids = self._select(connection, paths)
+        missing = [p for p in set(paths) if not p in ids]
+        if missing:
+            connection.executemany('INSERT OR IGNORE INTO paths (path) VALUES (?)', [(p,) for p in missing])
+            connection.commit()
+            ids.update(self._select(connection, missing))
+        return ids
+
+    def path(self, id_):
+        """
+        Return the path of ``id_``, or ``None`` if there is no such id.
+        """
+        try:
+            id_ = int(id_, 36)
+        except ValueError:
+            return None
+        row = self._connection().execute('SELECT path FROM paths WHERE id = ?', (id_,)).fetchone()
+        return row[0] if row else None
+
+    def move(self, src, dst, separator):
+        """
+        Assign the ids of ``src`` and all paths below it (i.e. starting with
+        ``src`` followed by ``separator``) to the respective ``dst`` paths.
+        Paths previously indexed under ``dst`` lose their ids.
+        """
+        connection = self._connection()
+        self._delete(connection, dst, separator)
+        prefix = src + separator
+        connection.execute('UPDATE paths SET path = ? || substr(path, ?) WHERE path = ? OR substr(path, 1, ?) = ?',
+                           (dst, len(src) + 1, src, len(prefix), prefix))
+        connection.commit()
+
+    def remove(self, path, separator):
+        """
+        Remove ``path`` and all paths below it from the index.
+        """
+        connection = self._connection()
+        self._delete(connection, path, separator)
+        connection.commit()
+
+    def _select(self, connection, paths):
+        """
+        Return a dictionary mapping the indexed ones of ``paths`` to their ids.
+        """
+        paths = list(paths)
+        ids = {}
+        for i in range(0, len(paths), _BATCH_SIZE):
+            batch = paths[i:i + _BATCH_SIZE]
+            query = 'SELECT path, id FROM paths WHERE path IN (%s)' % ','.join(['?'] * len(batch))
+            for path, id_ in connection.execute(query, batch):
+                ids[path] = _base36(id_)
+        return ids
+
+    def _delete(self, connection, path, separator):
+        prefix = path + separator
+        connection.execute('DELETE FROM paths WHERE path = ? OR substr(path, 1, ?) = ?', (path, len(prefix), prefix))
+
+def _base36(number):
+    """
+    Return the base 36 representation of a positive integer.
+    """
+    digits = []
+    while number:
+        number, digit = divmod(number, 36)
+        digits.append(_DIGITS[digit])
+    return ''.join(reversed(digits)) or '0'
@@ -0,0 +1,147 @@
+#The fileinfo keys stored in ElfinderStat slots, in their pickled order
+STAT_KEYS = ('name', 'hash', 'phash', 'mime', 'ts', 'size', 'read', 'write', 'locked',
+             'hidden', 'dirs', 'tmb', 'dim', 'alias', 'thash', 'volumeid')
+
+_STAT_KEYS = frozenset(STAT_KEYS)
+
+#Fileinfo fields that are expensive to compute and can be left out on request
+OPTIONAL_FIELDS = ('dirs', 'tmb', 'dim')
+
+class ElfinderStat(object):
+    """
+    A compact fileinfo record. It behaves like the fileinfo dictionary
+    described in :func:`elfinder.volumes.base.ElfinderVolumeDriver.stat`,
+    but stores the common keys in slots instead of a per-record dictionary.
+    Other keys (e.g. driver-specific ones) are kept in an extra dictionary.
+
+    Records are pickled (e.g. when cached) as a plain tuple of values in
+    :const:`STAT_KEYS` order and are expanded to a dictionary only when
+    serialized to json (see :func:`elfinder.utils.stat.json_default`).
+    ``None`` values are not preserved when pickled.
+    
+    The ``fields`` attribute holds the optional fields (see 
+    :func:`elfinder.volumes.base.ElfinderVolumeDriver.set_fields`) the 
+    record was computed with, or ``None`` if it holds all of them.
+    """
+    __slots__ = STAT_KEYS + ('_extra', 'fields')
+
+    def __init__(self, stat=None):
+        self._extra = None
+        self.fields = None
+        if stat:
+            self.update(stat)
+
+    def __getitem__(self, key):
+        if key in _STAT_KEYS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in _STAT_KEYS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _STAT_KEYS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in _STAT_KEYS:
+            return hasattr(self, key)
+        return bool(self._extra) and key in self._extra
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, ElfinderStat):
+            other = other.as_dict()
+        return self.as_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'ElfinderStat(%r)' % self.as_dict()
+
+    def __reduce__(self):
+        #fields are pickled as a bit mask
+        fields = None if self.fields is None else sum(1 << i for i, f in enumerate(OPTIONAL_FIELDS) if f in self.fields)
+        return (_unpack, (tuple(getattr(self, key, None) for key in STAT_KEYS) + (self._extra, fields),))
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        keys = [key for key in STAT_KEYS if hasattr(self, key)]
+        if self._extra:
+            keys.extend(self._extra.keys())
+        return keys
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def update(self, other):
+        for key, value in other.items():
+            self[key] = value
+
+    def copy(self):
+        stat = ElfinderStat(self)
+        stat.fields = self.fields
+        return stat
+
+    def as_dict(self):
+        """
+        Return the fileinfo dictionary.
+        """
+        return dict(self.items())
+
+def _unpack(values):
+    """
+    Create an :class:`elfinder.utils.stat.ElfinderStat` out of
+    its pickled ``values``.
+    """
+    stat = ElfinderStat()
+    for key, value in zip(STAT_KEYS, values):
+        if value is not None:
+            setattr(stat, key, value)
+    stat._extra, fields = values[len(STAT_KEYS):]
+    if fields is not None:
+        stat.fields = frozenset(f for i, f in enumerate(OPTIONAL_FIELDS) if fields & (1 << i))
+    return stat
+
+def json_default(obj):
+    """
+    Expand :class:`elfinder.utils.stat.ElfinderStat` records to
+    dictionaries when serializing to json. Use it as the ``default``
+    argument of :py:func:`json.dumps`.
+    """
+    if isinstance(obj, ElfinderStat):
+        return obj.as_dict()
+    raise TypeError('%r is not JSON serializable' % obj)
@@ -0,0 +1,91 @@
+import json, time
+from collections import Iterator
+from elfinder.utils.stat import json_default
+
+def file_iterator(volume, fp, hash_, chunk_size=65536, length=None):
+    """
+    Iterate over an opened file pointer in chunks of ``chunk_size`` bytes,
+    reading at most ``length`` bytes (or up to the end of file if ``None``).
+    The file pointer is closed through the volume's
+    :func:`elfinder.volumes.base.ElfinderVolumeDriver.close` method
+    when the iteration finishes (or the response is closed).
+
+    Args:
+        :volume: The volume that opened the file.
+        :fp: The file pointer, as returned by :func:`elfinder.volumes.base.ElfinderVolumeDriver.open`.
+        :hash_: The file hash.
+        :chunk_size: The maximum size of each chunk.
+        :length: The maximum number of bytes to read.
+    """
+    start, sent = time.time(), 0
+    try:
+        while length is None or length > 0:
+            chunk = fp.read(chunk_size if length is None else min(chunk_size, length))
+            if not chunk:
+                break
+            if length is not None:
+                length -= len(chunk)
+            sent += len(chunk)
+            yield chunk
+    finally:
+        volume.close(fp, hash_)
+        volume.logger.debug('%s: Streamed %s bytes of %s in %.3f seconds' % (volume.id(), sent, hash_, time.time() - start))
+
+def json_iterator(context, chunk_size=65536):
+    """
+    Iterate over the json representation of the ``context`` dictionary
+    in chunks of (roughly) ``chunk_size`` bytes. Values that are iterators
+    (e.g. the ``files`` generator of a lazy
+    :class:`elfinder.connector.ElfinderConnector`) are encoded one item at
+    a time, so the whole list never needs to be held in memory.
+    
+    The ``debug`` key, if any, is always encoded last. If its value is
+    callable, it is called at that point and its result is encoded
+    instead, so that it can report the serialization time.
+
+    Args:
+        :context: The dictionary to encode.
+        :chunk_size: The minimum size of each chunk (except from the last one).
+    """
+    buf = []
+    size = 0
+    
+    for part in _iterencode(context):
+        buf.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield ''.join(buf)
+            buf = []
+            size = 0
+            
+    if buf:
+        yield ''.join(buf)
+
+def has_iterators(context):
+    """
+    Return ``True`` if any of the ``context`` dictionary values is an iterator.
+    """
+    return isinstance(context, dict) and any(isinstance(value, Iterator) for value in context.values())
+
+def _iterencode(context):
+    """
+    Generate the json-encoded parts of the ``context`` dictionary.
+    """
+    keys = [key for key in context if key != 'debug']
+    if 'debug' in context:
+        keys.append('debug')
+    
+    yield '{'
+    for i, key in enumerate(keys):
+        value = context[key]
+        if key == 'debug' and callable(value):
+            value = value()
+        yield '%s%s: ' % (', ' if i else '', json.dumps(key))
+        if isinstance(value, Iterator):
+            yield '['
+            for j, item in enumerate(value):
+                yield '%s%s' % (', ' if j else '', json.dumps(item, default=json_default))
+            yield ']'
+        else:
+            yield json.dumps(value, default=json_default)
+    yield '}'
@@ -1,51 +1,141 @@
+import threading
+from hashlib import md5
 from django.utils.importlib import import_module
-from elfinder.conf import settings as ls 
+from elfinder.conf import settings as ls
 
+#Process-wide registry of mounted volumes.
+#Maps a digest of the root options to a (startPath, volume) tuple.
+_mounted_volumes = {}
+#Mount locks per options digest, so that mounting a root does not block others
+_mount_locks = {}
+_mount_locks_lock = threading.Lock()
 
 def get_path_driver(hash_, optionset):
     """
     Given an ``optionset`` and a path ``hash_`` this function returns
     a mounted volume driver for this path.
-    
-    This method assumes that the driver uses the default driver 
+
+    This method assumes that the driver uses the default driver
     :func:`elfinder.volumes.base.ElfinderVolumeDriver.id` implementation
     to generate its id.
     """
     for root_options in ls.ELFINDER_CONNECTOR_OPTION_SETS[optionset]['roots']:
         if 'driver' in root_options:
-            if hash_.startswith('%s%s_' % (root_options['driver']._driver_id, root_options['id'])):
+            if hash_.startswith(get_volume_id(root_options)):
                 return instantiate_driver(root_options)
 
- 
-def instantiate_driver(root_options):
+def get_volume_id(root_options):
     """
-    Instantiate and return a  driver, given its ``root_options``.
+    Return the id of the volume that ``root_options`` describe, without
+    mounting it.
+
+    This method assumes that the driver uses the default driver
+    :func:`elfinder.volumes.base.ElfinderVolumeDriver.id` implementation
+    to generate its id.
     """
-    class_ = root_options['driver'] if 'driver' in root_options else ''
+    if not 'id' in root_options or not root_options['id']:
+        raise Exception('No volume id found')
+
+    class_ = get_driver_class(root_options)
+    if not hasattr(class_, '_driver_id'):
+        raise Exception('Driver "%s" does not exist' % class_)
+    return '%s%s_' % (class_._driver_id, root_options['id'])
 
-    if 'driverInstance' in root_options and isinstance(root_options['driverInstance'], class_):
-        return root_options['driverInstance']
+def get_driver_class(root_options):
+    """
+    Return the driver class, given its ``root_options``. The ``driver``
+    option can either be a class or a class path string.
+    """
+    class_ = root_options['driver'] if 'driver' in root_options else ''
 
     if isinstance(class_, basestring) and class_:
         try:
             split = class_.split('.')
             storage_module = import_module('.'.join(split[:-1]))
-            volume = getattr(storage_module, split[-1])()
+            return getattr(storage_module, split[-1])
         except:
             raise Exception('Could not import driver "%s"' % class_)
-    else:
-        try:
-            volume = class_()
-        except TypeError:
-            raise Exception('Driver "%s" does not exist' % class_)
+    
+    return class_
+
+def instantiate_driver(root_options):
+    """
+    Return a mounted driver, given its ``root_options``.
+
+    Each distinct set of root options is mounted only once per process, 
+    so optionsets sharing a root id but not its other options each keep
+    their own mounted volume. Subsequent calls return a lightweight 
+    per-request view of the mounted volume (see
+    :func:`elfinder.volumes.base.ElfinderVolumeDriver.request_view`). The
+    ``startPath`` option does not cause a new mount; it is applied to the
+    returned view instead.
+    """
+    key = _options_digest(root_options)
+    start_path = root_options['startPath'] if 'startPath' in root_options else ''
+
+    entry = _mounted_volumes.get(key)
+    if entry is None:
+        with _mount_lock(key):
+            entry = _mounted_volumes.get(key)
+            if entry is None:
+                entry = (start_path, mount_driver(root_options))
+                _mounted_volumes[key] = entry
+                #some drivers store additional keys in root_options on mount
+                _mounted_volumes.setdefault(_options_digest(root_options), entry)
+
+    volume = entry[1].request_view()
+    if start_path != entry[0]:
+        volume.set_start_path(start_path)
+
+    return volume
+
+def mount_driver(root_options):
+    """
+    Instantiate and mount a new driver, given its ``root_options``. Unlike
+    :func:`elfinder.utils.volumes.instantiate_driver`, this
+    always performs a fresh mount.
+    """
+    class_ = get_driver_class(root_options)
+
+    try:
+        volume = class_()
+    except TypeError:
+        raise Exception('Driver "%s" does not exist' % class_)
 
     try:
         volume.mount(root_options)
     except Exception as e:
         raise Exception('Driver "%s" " %s' % (class_, e))
 
-    #store driver instance in memory, if the 'keepAlive' option is set
-    if 'keepAlive' in root_options and root_options['keepAlive']:
-        root_options['driverInstance'] = volume
-
     return volume
+
+def _mount_options(root_options):
+    """
+    Return the options that affect how a root is mounted.
+    """
+    return dict((k, v) for k, v in root_options.items() if not k in ['startPath', 'keepAlive', 'driverInstance'])
+
+def _options_digest(root_options):
+    """
+    Return a digest of the options that affect how a root is mounted.
+    """
+    return md5(repr(_freeze(_mount_options(root_options)))).hexdigest()
+
+def _freeze(value):
+    """
+    Return ``value`` with dictionaries turned into sorted tuples of items
+    (recursively), so that its representation does not depend on the 
+    ordering of dictionary keys.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _mount_lock(key):
+    """
+    Return the lock guarding the mount of the ``key`` options digest.
+    """
+    with _mount_locks_lock:
+        return _mount_locks.setdefault(key, threading.Lock())
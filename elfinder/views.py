@@ -1,11 +1,13 @@
-import json
-from django.http import HttpResponse, Http404
+import json, time
+from django.http import HttpResponse, StreamingHttpResponse, Http404
 from django.utils.decorators import method_decorator
 from django.views.generic.base import View
 from django.views.decorators.csrf import csrf_exempt
 from exceptions import ElfinderErrorMessages
 from elfinder.connector import ElfinderConnector
 from elfinder.conf import settings as ls
+from elfinder.utils.streaming import file_iterator, json_iterator, has_iterators
+from elfinder.utils.stat import json_default
 
 
 class ElfinderConnectorView(View):
@@ -13,6 +15,13 @@ class ElfinderConnectorView(View):
     Default elfinder backend view
     """
     
+    #the size of the chunks used to stream files to the client
+    file_chunk_size = 65536
+    #stream json responses holding large file lists, see get_connector()
+    stream_json = True
+    #commands that cannot run in a batch request
+    batch_disallowed = ['batch', 'file', 'upload']
+    
     def render_to_response(self, context, **kwargs):
         """
         It returns a json-encoded response, unless it was otherwise requested
@@ -35,23 +44,52 @@ class ElfinderConnectorView(View):
         if not 'content_type' in kwargs:
             kwargs['content_type'] = 'application/json'
             
-        if 'pointer' in context: #return file
-            context['pointer'].seek(0)
-            kwargs['content'] = context['pointer'].read()
-            context['volume'].close(context['pointer'], context['info']['hash'])
-        elif 'raw' in context and context['raw'] and 'error' in context and context['error']: #raw error, return only the error list
-            kwargs['content'] = context['error']
+        if 'pointer' in context: #stream file
+            if 'range' in context: #partial content
+                start, end = context['range']
+                context['pointer'].seek(start)
+                length = end - start + 1
+            else:
+                context['pointer'].seek(0)
+                length = None
+            kwargs['streaming_content'] = file_iterator(context['volume'], context['pointer'], context['info']['hash'], self.file_chunk_size, length)
+        elif 'sendfile' in context: #the web server will send the file
+            kwargs['content'] = ''
+        elif 'raw' in context and context['raw']: #raw response, return only the error list (if any)
+            kwargs['content'] = context['error'] if 'error' in context else ''
         elif kwargs['content_type'] == 'application/json': #return json
-            kwargs['content'] = json.dumps(context)
+            if 'debug' in context: #report the serialization time
+                context['debug'] = self.debug_info(time.time())
+                
+            if has_iterators(context): #stream json
+                kwargs['streaming_content'] = json_iterator(context)
+            elif 'debug' in context:
+                kwargs['content'] = ''.join(json_iterator(context))
+            else:
+                kwargs['content'] = json.dumps(context, default=json_default)
         else: #return context as is!
             kwargs['content'] = context
         
-        response = HttpResponse(**kwargs)
+        response = StreamingHttpResponse(**kwargs) if 'streaming_content' in kwargs else HttpResponse(**kwargs)
         for key, value in additional_headers.items():
             response[key] = value
 
         return response
     
+    def debug_info(self, start):
+        """
+        Return a callable returning the connector debug info (see 
+        :func:`elfinder.connector.ElfinderConnector.debug_info`), including
+        the time spent on serializing the response since ``start`` as
+        the ``serialization`` phase. The json encoder calls it once the
+        rest of the response is encoded.
+        """
+        def debug():
+            info = self.elfinder.debug_info()
+            info['phases']['serialization'] = time.time() - start
+            return info
+        return debug
+    
     def output(self, cmd, src):
         """
         Collect command arguments, operate and return self.render_to_response()
@@ -78,6 +116,58 @@ class ElfinderConnectorView(View):
 
         return self.render_to_response(self.elfinder.execute(cmd, **args))
     
+    def batch(self, src):
+        """
+        Execute the commands of a ``batch`` request and return a json list
+        holding the result of each one, in the order they were requested.
+
+        The ``commands`` request parameter must hold a json-encoded list of
+        objects, each providing the ``cmd`` name and the command arguments,
+        e.g. ``[{"cmd" : "ls", "target" : "..."}, {"cmd" : "tmb", "targets" : [...]}]``.
+        All commands run against the same connector, so each volume is
+        mounted only once. Commands that do not return json (``file``)
+        or need uploaded files (``upload``) are not allowed in a batch.
+        """
+        try:
+            commands = json.loads(src['commands'])
+            if not isinstance(commands, list):
+                raise ValueError
+        except (KeyError, TypeError, ValueError):
+            return self.render_to_response({'error' : self.elfinder.error(ElfinderErrorMessages.ERROR_INV_PARAMS, 'batch')})
+
+        debug = src['debug'] if 'debug' in src else False
+        results = []
+        for command in commands:
+            cmd = command.get('cmd', '') if isinstance(command, dict) else ''
+            if not cmd or cmd in self.batch_disallowed:
+                results.append({'error' : self.elfinder.error(ElfinderErrorMessages.ERROR_UNKNOWN_CMD, cmd)})
+                continue
+
+            args = {}
+            for name in self.elfinder.commandArgsList(cmd):
+                if name == 'request':
+                    args['request'] = self.request
+                elif name == 'targets':
+                    targets = command.get('targets', command.get('targets[]', []))
+                    args[name] = targets if isinstance(targets, list) else [targets]
+                else:
+                    arg = name
+                    if name.endswith('_'):
+                        name = name[:-1]
+                    if name in command:
+                        try:
+                            args[arg] = command[name].strip()
+                        except:
+                            args[arg] = command[name]
+            args['debug'] = command.get('debug', debug)
+
+            result = self.elfinder.execute(cmd, **args)
+            if 'header' in result:
+                del result['header']
+            results.append(result)
+
+        return HttpResponse(json.dumps(results, default=json_default), content_type='application/json')
+
     def get_command(self, src):
         """
         Get requested command
@@ -87,6 +177,16 @@ class ElfinderConnectorView(View):
         except KeyError:
             return 'open'
         
+    def get_connector(self, cmd, **kwargs):
+        """
+        Return the connector for this request. Unless ``stream_json``
+        is ``False``, the connector returns lazy file lists for the 
+        ``open``, ``ls`` and ``search`` commands, which are then streamed
+        to the client. Batch requests never use lazy lists, since
+        each command must complete before the next one runs.
+        """
+        return ElfinderConnector(self.get_optionset(**kwargs), self.request.session, lazy=self.stream_json and cmd != 'batch')
+    
     def get_optionset(self, **kwargs):
         set_ = ls.ELFINDER_CONNECTOR_OPTION_SETS[kwargs['optionset']]
         if kwargs['start_path'] != 'default':
@@ -104,17 +204,23 @@ class ElfinderConnectorView(View):
         """
         used in get method calls
         """
-        self.elfinder = ElfinderConnector(self.get_optionset(**kwargs), request.session)
-        return self.output(self.get_command(request.GET), request.GET)
+        cmd = self.get_command(request.GET)
+        self.elfinder = self.get_connector(cmd, **kwargs)
+        if cmd == 'batch':
+            return self.batch(request.GET)
+        return self.output(cmd, request.GET)
 
     def post(self, request, *args, **kwargs):
         """
         called in post method calls.
-        It only allows for the 'upload' command
+        It only allows for the 'upload' and 'batch' commands
         """
-        self.elfinder = ElfinderConnector(self.get_optionset(**kwargs), request.session)
         cmd = self.get_command(request.POST)
+        self.elfinder = self.get_connector(cmd, **kwargs)
         
+        if cmd == 'batch':
+            return self.batch(request.POST)
+
         if not cmd in ['upload']:
             self.render_to_response({'error' : self.elfinder.error(ElfinderErrorMessages.ERROR_UPLOAD, ElfinderErrorMessages.ERROR_UPLOAD_TOTAL_SIZE)})
 
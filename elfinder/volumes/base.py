@@ -1,15 +1,80 @@
-import os, datetime, mimetypes, re, inspect, time, logging
+import os, datetime, mimetypes, re, inspect, time, logging, copy, json, threading, random, zlib
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 try:
     from PIL import Image
 except ImportError:
     import Image
-from base64 import b64encode, b64decode
+from base64 import b64encode, b64decode, urlsafe_b64encode, urlsafe_b64decode
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from functools import wraps
+from hashlib import md5
+from itertools import chain, islice
 from string import maketrans
 from tarfile import TarFile
 from django.core.cache import cache
 from django.utils.translation import ugettext as _
 from elfinder.exceptions import ElfinderErrorMessages, FileNotFoundError, DirNotFoundError, PermissionDeniedError, NamedError, NotAnImageError
 from elfinder.utils.archivers import ZipFileArchiver
+from elfinder.utils.lru import LRUCache
+from elfinder.utils.pathindex import PathIndex
+from elfinder.utils.stat import ElfinderStat, OPTIONAL_FIELDS
+
+#Driver methods whose calls are counted and timed, see ElfinderVolumeDriver.debug()
+COUNTED_METHODS = ['_stat', '_scandir', '_fopen', '_mimetype', '_dimensions']
+
+#Counters reported by ElfinderVolumeDriver.debug()
+COUNTERS = [m[1:] for m in COUNTED_METHODS] + ['cacheGet', 'cacheSet', 'cacheDelete', 'cacheHit', 'cacheMiss', 'bytesRead', 'bytesWritten', 'cacheLock', 'cacheStaleHit', 'cacheWait']
+
+#Seconds to keep the cache generation of a volume
+GENERATION_TIMEOUT = 60 * 60 * 24 * 10
+
+#Fileinfo fields that are expensive to compute and can be left out on request
+OPTIONAL_FIELDS = frozenset(OPTIONAL_FIELDS)
+
+#Seconds after which a cache rebuild lock is released, if its holder never does
+LOCK_TIMEOUT = 30
+
+class PackedValue(namedtuple('PackedValue', 'compressed data parts')):
+    """
+    A large cache value, pickled and optionally compressed. The pickled
+    ``data`` is either stored inline or split in cache entries whose keys
+    are listed in ``parts``.
+    See :func:`elfinder.volumes.base.ElfinderVolumeDriver._cache_pack`.
+    """
+    pass
+
+def _counted(counter, method):
+    """
+    Wrap a driver ``method`` so that its calls increase the ``counter``
+    and its running time is recorded.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = time.time()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._count(counter, elapsed=time.time() - start)
+    wrapper._counted = True
+    return wrapper
+
+class ElfinderVolumeDriverType(type):
+    """
+    Metaclass of the volume drivers. It wraps the ``COUNTED_METHODS`` a
+    driver class implements, so that every driver reports its operation
+    counters (see :func:`elfinder.volumes.base.ElfinderVolumeDriver.debug`)
+    without extra code.
+    """
+    
+    def __new__(mcs, name, bases, attrs):
+        for method in COUNTED_METHODS:
+            if method in attrs and callable(attrs[method]) and not hasattr(attrs[method], '_counted'):
+                attrs[method] = _counted(method[1:], attrs[method])
+        return super(ElfinderVolumeDriverType, mcs).__new__(mcs, name, bases, attrs)
 
 class ElfinderVolumeDriver(object):
     """
@@ -17,6 +82,8 @@ class ElfinderVolumeDriver(object):
     this volume.
     """
     
+    __metaclass__ = ElfinderVolumeDriverType
+    
     #The driver id.
     #Must start with a letter and contain only [a-z0-9]
     #Used as part of volume id
@@ -25,6 +92,9 @@ class ElfinderVolumeDriver(object):
     #Directory separator - required by the client
     _separator = os.sep
     
+    #Stat keys directory listings can be sorted by, see page()
+    _sort_keys = ['name', 'ts', 'size', 'mime']
+    
     #*********************************************************************#
     #*                            INITIALIZATION                         *#
     #*********************************************************************#
@@ -48,6 +118,16 @@ class ElfinderVolumeDriver(object):
         self._start_path = ''
         #Store moved  or overwrited files info
         self._removed = []
+        #Guards the removed files list when files are removed concurrently
+        self._removed_lock = threading.Lock()
+        #Operation counters and timers, see debug()
+        self._reset_counters()
+        #Cache generation, fetched once per request view
+        self._cache_generation = None
+        #Directory tokens, children tokens and key chains, memoized per request view
+        self._dir_tokens = {}
+        self._children_tokens = {}
+        self._key_chains = {}
         #Is thumbnails dir writable
         self._tmb_path_writable = False
         #Today 24:00 timestamp
@@ -56,8 +136,23 @@ class ElfinderVolumeDriver(object):
         self._yesterday = 0
         #list of attributes
         self._attributes = []
+        #(number of attributes, compiled rules) tuple
+        self._attribute_rules = None
+        #Memoized path hashes and decoded paths
+        self._hashes = LRUCache(0)
+        self._paths = LRUCache(0)
+        #Persistent index of short path ids, if enabled
+        self._path_index = None
+        #Attributes of each path, memoized per request view
+        self._attr_memo = {}
+        #Attributes returned by the accessControlBatch callable, not evaluated yet
+        self._attr_batch = {}
         #Default permissions
         self._defaults = {}
+        #The mime filter set in the options
+        self._only_mimes = []
+        #The optional fileinfo fields to compute
+        self._fields = OPTIONAL_FIELDS
         #Archivers config
         self._archivers = {
             'create' : {},
@@ -121,6 +216,8 @@ class ElfinderVolumeDriver(object):
             'acceptedName' : r'^[^\.].*', #<-- DONT touch this! Use constructor options to overwrite it!
             #callable to control file permissions
             'accessControl' : None,
+            #callable to control the permissions of many files of a directory at once
+            'accessControlBatch' : None,
             #default permissions. Do not set hidden/locked here - take no effect
             'defaults' : {
                 'read' : True,
@@ -138,7 +235,19 @@ class ElfinderVolumeDriver(object):
             #max allowed archive files size (0 - no limit)
             'archiveMaxSize' : 0,
             #seconds to cache the file and dir data used by the driver 
-            'cache' : 600
+            'cache' : 600,
+            #seconds to keep serving expired cache data while it is rebuilt
+            'cacheStale' : 30,
+            #max seconds to wait for another request to rebuild missing cache data
+            'cacheWait' : 1,
+            #compress cached data larger than this number of bytes (0 - never)
+            'cacheCompress' : 100 * 1024,
+            #split cached data larger than this number of bytes in many entries (0 - never)
+            'cacheChunkSize' : 1000 * 1000,
+            #number of path hashes to remember
+            'hashCacheSize' : 10000,
+            #SQLite database file assigning short ids to paths ('' - use the paths themselves)
+            'pathIndex' : ''
         }
                 
     #*********************************************************************#
@@ -170,11 +279,23 @@ class ElfinderVolumeDriver(object):
         
             :id:    the volume id
             :name:    the volume name
-        """
-        return {
-            'id' : self.id(),
-            'name' : self.name(),
-        }
+            :counters:    a dictionary holding the number of ``_stat``, ``_scandir``,
+                ``_fopen``, ``_mimetype`` and ``_dimensions`` calls, the 
+                number of cache gets, sets, deletes, hits and misses and 
+                the number of bytes read and written. 
+            :time:    the time (in seconds) spent on each of the above
+                driver methods and on cache operations.
+        
+        Counters are kept per request, see
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver.request_view`.
+        """
+        with self._counters_lock:
+            return {
+                'id' : self.id(),
+                'name' : self.name(),
+                'counters' : dict(self._counters),
+                'time' : dict(self._timers)
+            }
     
     def mount(self, opts):
         """
@@ -185,6 +306,8 @@ class ElfinderVolumeDriver(object):
         """
         
         self._options.update(opts)
+        #keep the configured mime filter, see set_mimes_filter()
+        self._only_mimes = self._options['onlyMimes']
 
         if self._options['id']:
             self._id = '%s%s_' % (self._driver_id, self._options['id'])
@@ -193,6 +316,10 @@ class ElfinderVolumeDriver(object):
         
         self._root = self._normpath(unicode(self._options['path']))
         self._separator = self._options['separator'] if 'separator' in self._options else os.sep
+        self._hashes = LRUCache(self._options['hashCacheSize'])
+        self._paths = LRUCache(self._options['hashCacheSize'])
+        if self._options['pathIndex']:
+            self._path_index = PathIndex(self._options['pathIndex'])
 
         #default file attribute
         self._defaults = {
@@ -245,15 +372,7 @@ class ElfinderVolumeDriver(object):
         
         if 'read' in root and root['read']:
             #check startPath - path to open by default instead of root
-            if self._options['startPath']:
-                try:
-                    startpath = self._join_path(self._root, self._options['startPath'])
-                    start = self.stat(startpath)
-                    if start['mime'] == 'directory' and start['read'] and not self._is_hidden(start):
-                        self._start_path = self._normpath(startpath)
-                except os.error:
-                    #Fail silently if startPath does not exist
-                    pass
+            self.set_start_path(self._options['startPath'])
         else:
             self._options['URL'] = ''
             self._options['tmbURL'] = ''
@@ -294,6 +413,7 @@ class ElfinderVolumeDriver(object):
                 self._options['disabled'].append('extract')
         
         self._configure()
+        self._compile_attributes()
 
         self._mounted = True
         
@@ -329,6 +449,55 @@ class ElfinderVolumeDriver(object):
             else:
                 self._options['tmbPath'] = ''
     
+    def request_view(self):
+        """
+        Return a lightweight copy of this mounted volume, to be used
+        while serving a single request.
+        
+        The copy shares all mount-time state (root, attributes, archivers
+        etc.) with the original volume, but gets its own options dictionary
+        and removed files list. This way per-request changes (e.g. the mime
+        filter set through 
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver.set_mimes_filter`)
+        do not leak into other requests served by the same mounted volume.
+        """
+        view = copy.copy(self)
+        view._options = self._options.copy()
+        view._removed = []
+        view._removed_lock = threading.Lock()
+        view._reset_counters()
+        view._cache_generation = None
+        view._dir_tokens = {}
+        view._children_tokens = {}
+        view._key_chains = {}
+        view._attr_memo = {}
+        view._attr_batch = {}
+        view._fields = OPTIONAL_FIELDS
+        if self._path_index:
+            #indexed paths may move in other processes, memoize hashes per request only
+            view._hashes = LRUCache(self._options['hashCacheSize'])
+            view._paths = LRUCache(self._options['hashCacheSize'])
+        return view
+    
+    def set_start_path(self, start_path):
+        """
+        Set the directory to open by default instead of the root. The path
+        is relative to the root and will be ignored if it does not point to
+        a readable, visible directory.
+        """
+        self._options['startPath'] = start_path
+        self._start_path = ''
+        
+        if start_path:
+            try:
+                startpath = self._join_path(self._root, start_path)
+                start = self.stat(startpath)
+                if start['mime'] == 'directory' and start['read'] and not self._is_hidden(start):
+                    self._start_path = self._normpath(startpath)
+            except os.error:
+                #Fail silently if startPath does not exist
+                pass
+    
     def unmount(self):
         """
         The unmunt method is currently not used, but in the future it
@@ -387,9 +556,19 @@ class ElfinderVolumeDriver(object):
     
     def set_mimes_filter(self, mimes):
         """
-        Set mimetypes allowed to display to the client.
+        Set mimetypes allowed to display to the client. If ``mimes`` is
+        ``None``, the :ref:`setting-onlyMimes` option is restored.
         """
-        self._options['onlyMimes'] = mimes
+        self._options['onlyMimes'] = mimes if mimes is not None else self._only_mimes
+
+    def set_fields(self, fields):
+        """
+        Set the optional fileinfo fields (any of ``'dirs'``, ``'tmb'``
+        and ``'dim'``) to compute. These are expensive to compute,
+        e.g. ``'dim'`` opens each image file. If ``fields`` is ``None``, 
+        all fields are computed.
+        """
+        self._fields = OPTIONAL_FIELDS if fields is None else OPTIONAL_FIELDS.intersection(fields)
 
     def mime_accepted(self, mime, mimes = [], empty = True):
         """
@@ -423,13 +602,15 @@ class ElfinderVolumeDriver(object):
         """
         Return a list of moved/overwrited files.
         """
-        return self._removed
+        with self._removed_lock:
+            return list(self._removed)
     
     def reset_removed(self):
         """
         Clean removed files list.
         """
-        self._removed = []
+        with self._removed_lock:
+            self._removed = []
     
     def closest(self, hash_, attr, val):
         """
@@ -464,33 +645,89 @@ class ElfinderVolumeDriver(object):
         
         return dir_
     
-    def scandir(self, hash_):
+    def scandir(self, hash_, lazy=False):
         """
         Return directory contents. 
         Raises a ``DirNotFoundError`` if ``hash_`` is not a valid dir, 
         or a ``PermissionDenied Error`` if the user cannot access the data.
+        If ``lazy`` is ``True``, a generator is returned instead of a list.
         """
         if not self.dir(hash_)['read']:
             raise PermissionDeniedError
-        return self._get_scandir(self.decode(hash_))
+        
+        files = self._iter_scandir(self.decode(hash_))
+        return self._prefetch(files) if lazy else list(files)
 
-    def ls(self, hash_):
+    def ls(self, hash_, lazy=False):
         """
         List directory files. Can raise
         ``PermissionDeniedError``, ``FileNotFoundError``, ``DirNotFoundError``
         If a mime filter is set, use it to return only accepted listings.
+        If ``lazy`` is ``True``, a generator is returned instead of a list.
         """
         if not self.dir(hash_)['read']:
             raise PermissionDeniedError
         
-        list_ = []
-        path = self.decode(hash_)
-       
-        for stat in self._get_scandir(path):
-            if self.mime_accepted(stat['mime']):
-                list_.append(stat['name'])
+        list_ = (stat['name'] for stat in self._iter_scandir(self.decode(hash_)))
+        return self._prefetch(list_) if lazy else list(list_)
 
-        return list_
+    def page(self, hash_, limit=None, cursor='', sort='name'):
+        """
+        Return a ``(files, cursor)`` tuple holding at most ``limit`` files
+        of a directory, sorted by ``sort`` (one of ``'name'``, ``'ts'``,
+        ``'size'`` or ``'mime'``, prefixed with ``'-'`` for descending
+        order), and an opaque cursor to request the next page with 
+        (or ``None`` if this is the last page). A ``cursor`` returned
+        by a previous call starts the page right after that call's 
+        last file.
+        
+        A sorted index of the directory is cached, so only the files of
+        the requested page are stat'ed. Sorting by ``'name'`` needs no 
+        stats at all to build the index.
+        
+        Raises ``PermissionDeniedError``, ``FileNotFoundError``, 
+        ``DirNotFoundError`` or a ``ValueError`` if ``sort``
+        or ``cursor`` is invalid.
+        """
+        if not self.dir(hash_)['read']:
+            raise PermissionDeniedError
+        
+        key = sort[1:] if sort.startswith('-') else sort
+        if not key in self._sort_keys:
+            raise ValueError('Invalid sort key')
+        if limit is not None and limit < 1:
+            raise ValueError('Invalid limit')
+        
+        path = self.decode(hash_)
+        index = self._get_sorted_dir(path, key)
+        
+        if cursor:
+            last = self._decode_cursor(cursor, sort)
+            if sort.startswith('-'):
+                positions = xrange(bisect_left(index, last) - 1, -1, -1)
+            else:
+                positions = xrange(bisect_right(index, last), len(index))
+        else:
+            positions = xrange(len(index) - 1, -1, -1) if sort.startswith('-') else xrange(len(index))
+        
+        #map paths to their index entries, to create the cursor
+        entries = {}
+        def paths():
+            for i in positions:
+                p = self._join_path(path, index[i][1])
+                entries[p] = index[i]
+                yield p
+        
+        files = []
+        #stat one more file than required, to check if there is a next page
+        for p, stat in self._iter_stats(paths(), limit + 1 if limit else 500):
+            if not self._is_hidden(stat) and self.mime_accepted(stat['mime']):
+                if limit and len(files) >= limit:
+                    return (files, self._encode_cursor(last, sort))
+                files.append(stat)
+                last = entries[p]
+        
+        return (files, None)
 
     def tree(self, hash_='', deep=0, exclude=''):
         """
@@ -610,6 +847,19 @@ class ElfinderVolumeDriver(object):
         Close a file pointer.
         """
         self._fclose(fp, path=self.decode(hash_))
+    
+    def sendfile(self, hash_):
+        """
+        Return a ``(header, value)`` tuple instructing the front-end web
+        server to send the ``hash_`` file to the client 
+        (e.g. ``('X-Sendfile', '/path/to/file')``), or ``None``
+        if the file must be served by the connector itself.
+        
+        The default implementation returns ``None``. Drivers
+        that can offload downloads to the web server should
+        override this method.
+        """
+        return None
 
     def mkdir(self, hash_dst, name):
         """
@@ -717,8 +967,11 @@ class ElfinderVolumeDriver(object):
         self._clear_cached_dir(dir_)
         #path may not be a dir, _clear_cached_dir() will just fail on the dir key and clear the file stat anyway
         self._clear_cached_dir(path)
+        if file_['mime'] == 'directory':
+            self._bump_dir_token(path)
+        self._index_moved(path, ret)
 
-        self._removed.append(file_)
+        self._add_removed(file_)
 
         return self.stat(ret) 
 
@@ -820,6 +1073,7 @@ class ElfinderVolumeDriver(object):
         
         try:
             uploaded_path = self._save_uploaded(uploaded_file, dst, name, **kwargs)
+            self._count('bytesWritten', uploaded_file.size)
         except:
             raise Exception(ElfinderErrorMessages.ERROR_UPLOAD_FILE_SIZE)
         
@@ -916,7 +1170,9 @@ class ElfinderVolumeDriver(object):
         if not file_['read']:
             raise PermissionDeniedError
         
-        return self._get_contents(self.decode(hash_))
+        content = self._get_contents(self.decode(hash_))
+        self._count('bytesRead', len(content))
+        return content
     
     def put_contents(self, hash_, content):
         """
@@ -933,6 +1189,7 @@ class ElfinderVolumeDriver(object):
 
         self._clear_cached_stat(path)
         self._put_contents(path, content)
+        self._count('bytesWritten', len(content))
         
         return self.stat(path)
     
@@ -1051,11 +1308,13 @@ class ElfinderVolumeDriver(object):
             raise PermissionDeniedError
         return self.remove(self.decode(hash_))
     
-    def search(self, q):
+    def search(self, q, lazy=False):
         """
         Search files based on query ``q``.
+        If ``lazy`` is ``True``, a generator is returned instead of a list.
         """
-        return self._search(self._root, q)
+        result = self._iter_search(self._root, q)
+        return self._prefetch(result) if lazy else list(result)
 
     def dimensions(self, hash_):
         """
@@ -1078,7 +1337,19 @@ class ElfinderVolumeDriver(object):
     
     def encode(self, path):
         """
-        Encode path into hash
+        Encode path into hash. The :ref:`setting-hashCacheSize` most
+        recently used hashes are memoized.
+        """
+        if path:
+            hash_ = self._hashes.get(path)
+            if hash_ is None:
+                hash_ = self._encode(path)
+                self._hashes.set(path, hash_)
+            return hash_
+    
+    def _encode(self, path):
+        """
+        Encode path into hash, bypassing the memoized hashes.
         """
         if path:
             #cut ROOT from path for security reason, even if hacker decodes the path he will not know the root
@@ -1088,21 +1359,38 @@ class ElfinderVolumeDriver(object):
             if not p:
                 p = self._separator
 
-            hash_ = self._crypt(p)
-            #hash is used as id in HTML that means it must contain vaild chars
-            #make base64 html safe and append prefix in begining
-            hash_ = hash_.encode('utf-8') # unicode filename support
-            hash_ = b64encode(hash_).translate(maketrans('+/=', '-_.'))
+            return self._hash(self._crypt(p))
+    
+    def _hash(self, crypted):
+        """
+        Return the hash of a ``crypted`` path (see 
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._crypt`).
+        """
+        #hash is used as id in HTML that means it must contain vaild chars
+        #make base64 html safe and append prefix in begining
+        hash_ = crypted.encode('utf-8') # unicode filename support
+        hash_ = b64encode(hash_).translate(maketrans('+/=', '-_.'))
 
-            #remove dots '.' at the end (used to be '=' in base64, before the translation)
-            hash_ = hash_.rstrip('.')
+        #remove dots '.' at the end (used to be '=' in base64, before the translation)
+        hash_ = hash_.rstrip('.')
 
-            #append volume id to make hash unique
-            return self.id()+hash_
+        #append volume id to make hash unique
+        return self.id()+hash_
     
     def decode(self, hash_):
         """
-        Decode path from hash.
+        Decode path from hash. The :ref:`setting-hashCacheSize` most
+        recently used paths are memoized.
+        """
+        path = self._paths.get(hash_)
+        if path is None:
+            path = self._decode(hash_)
+            self._paths.set(hash_, path)
+        return path
+    
+    def _decode(self, hash_):
+        """
+        Decode path from hash, bypassing the memoized paths.
         """
         if hash_.startswith(self.id()):
             #cut volume id after it was prepended in encode
@@ -1122,17 +1410,71 @@ class ElfinderVolumeDriver(object):
     
     def _crypt(self, path):
         """
-        Return crypted path.
+        Return crypted path. If the :ref:`setting-pathIndex` option is set,
+        this is the path's id in the index.
         """
         #TODO: crypt and encrypt paths
+        if self._path_index:
+            #sqlite3 rejects 8-bit byte strings
+            return self._path_index.id(path.decode('utf-8') if isinstance(path, str) else path)
         return path
     
     def _uncrypt(self, hash_):
         """
-        Return uncrypted path.
+        Return uncrypted path. Raises ``FileNotFoundError`` if the 
+        :ref:`setting-pathIndex` option is set and ``hash_`` is not a 
+        valid id.
         """
+        if self._path_index:
+            path = self._path_index.path(hash_)
+            if path is None:
+                raise FileNotFoundError
+            return path
         return hash_
     
+    def _index_moved(self, src, dst):
+        """
+        Keep the ids of a moved file (and the files below it) in the 
+        :ref:`setting-pathIndex`, if enabled.
+        """
+        if self._path_index:
+            self._path_index.move(self._index_path(src), self._index_path(dst), self._separator)
+            self._hashes.clear()
+            self._paths.clear()
+    
+    def _index_removed(self, path):
+        """
+        Remove the ids of a removed file (and the files below it) from the
+        :ref:`setting-pathIndex`, if enabled.
+        """
+        if self._path_index:
+            self._path_index.remove(self._index_path(path), self._separator)
+            self._hashes.clear()
+            self._paths.clear()
+    
+    def _index_hashes(self, paths):
+        """
+        Memoize the hashes of ``paths`` and their parent directories that
+        are not memoized yet, reading (or assigning) their ids in the 
+        :ref:`setting-pathIndex` with a single transaction. Does nothing 
+        if the index is not enabled.
+        """
+        if self._path_index:
+            paths = set(p for p in paths if p)
+            paths.update([self._dirname(p) for p in paths if p != self._root])
+            missing = dict((self._index_path(p), p) for p in paths if self._hashes.get(p) is None)
+            if missing:
+                for index_path, id_ in self._path_index.ids(missing.keys()).items():
+                    self._hashes.set(missing[index_path], self._hash(id_))
+    
+    def _index_path(self, path):
+        """
+        Return ``path`` as stored in the :ref:`setting-pathIndex`, i.e. 
+        as passed to :func:`elfinder.volumes.base.ElfinderVolumeDriver._crypt`.
+        """
+        path = self._relpath(path) or self._separator
+        return path.decode('utf-8') if isinstance(path, str) else path
+    
     #*********************** file stat *********************#
     
     def stat(self, path):
@@ -1140,69 +1482,228 @@ class ElfinderVolumeDriver(object):
         Return fileinfo. Raises os.error if the path is invalid
         """
         
-        cache_key = 'elfinder::stat::%s' % self.encode(path)
-        stat_cache = cache.get(cache_key, None)
-        root_cache = cache.get('elfinder::stat::%sroot' % self.id())
+        def build():
+            self.logger.debug('%s: Caching STAT %s' % (self.id(), path))
+            return self._build_stat(path)
         
-        if stat_cache is None or root_cache != self._root:
-            #print cache_key, stat_cache, root_cache, self._root
-            stat = self._stat(path)
-            stat['hash'] = self.encode(path)
+        key = self._cache_key('stat', path)
+        return self._complete_stats({ path : self._cache_fetch(key, build, lock_miss=False) }, { path : key })[path]
     
-            if path == self._root:
-                stat['volumeid'] = self.id()
-                stat['name'] = self._root_name
+    def stat_many(self, paths, check_subfolders=None):
+        """
+        Return a dictionary mapping each one of the ``paths`` to its fileinfo.
+        Cached fileinfo is read with a single cache request and the missing
+        entries are written back with a single request as well. Paths that
+        are invalid (i.e. :func:`elfinder.volumes.base.ElfinderVolumeDriver.stat`
+        would raise os.error) are left out. ``check_subfolders`` overrides
+        the ``checkSubfolders`` option for missing entries.
+        
+        Expired entries are rebuilt under a single lock, only if no other 
+        request is already rebuilding them, otherwise they are served stale (see 
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._cache_fetch`).
+        """
+        if not self._options['cache']:
+            return self._build_stats(paths, check_subfolders)
+        
+        keys = dict((p, self._cache_key('stat', p)) for p in paths)
+        cached = self._cache_get_many(keys.values())
+        now = time.time()
+        
+        result = {}
+        rebuild = []
+        stale = {}
+        for p, key in keys.items():
+            if key in cached:
+                expires, value = cached[key]
+                value = self._cache_unpack(value)
+                if value is not None:
+                    if expires > now:
+                        result[p] = value
+                    else:
+                        stale[p] = value
+                    continue
+            rebuild.append(p)
+        
+        #entries of a listing expire together, a single lock guards the rebuild of all expired ones
+        lock = None
+        if stale:
+            lock = ' '.join(sorted(keys[p] for p in stale))
+            if self._cache_lock(lock):
+                rebuild.extend(stale.keys())
             else:
-                if not 'name' in stat or not stat['name']:
-                    stat['name'] = self._basename(path)
+                self._count('cacheStaleHit', len(stale))
+                result.update(stale)
+                lock = None
+        
+        try:
+            missing = self._build_stats(rebuild, check_subfolders)
+            if missing:
+                self._cache_set_many(dict((keys[p], self._cache_envelope(stat)) for p, stat in missing.items()), self._cache_timeout())
+                self.logger.debug('%s: Caching %s STATs' % (self.id(), len(missing)))
+        finally:
+            if lock:
+                self._cache_unlock(lock)
+        
+        result.update(missing)
+        return self._complete_stats(result, keys)
+    
+    def _complete_stats(self, stats, keys):
+        """
+        Compute again the cached ``stats`` (a dictionary mapping paths to
+        fileinfo) that lack some of the optional fields set by 
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver.set_fields`, and
+        update their cache entries (``keys`` maps paths to cache keys).
+        Return the updated ``stats``.
+        """
+        incomplete = {}
+        for p, stat in stats.items():
+            fields = getattr(stat, 'fields', None)
+            if fields is not None and not self._fields <= fields:
+                incomplete[p] = fields
+        
+        missing = {}
+        if incomplete:
+            self._batch_attrs(incomplete.keys())
+        for p, fields in incomplete.items():
+            try:
+                missing[p] = self._build_stat(p, self._fields | fields)
+            except os.error:
+                continue
+        
+        if missing and self._options['cache']:
+            self._cache_set_many(dict((keys[p], self._cache_envelope(stat)) for p, stat in missing.items()), self._cache_timeout())
+        
+        stats.update(missing)
+        return stats
     
-                if not 'phash' in stat or not stat['phash']:
-                    stat['phash'] = self.encode(self._dirname(path))
-                
-            if not 'size' in stat or (not stat['size'] and stat['mime'] == 'directory'):
-                stat['size'] = 'unknown'
-    
-            stat['read'] = int(self._attr(path, 'read', stat['read']))
-            stat['write'] = int(self._attr(path, 'write', stat['write']))
-            stat['locked'] = int(self._attr(path, 'locked', self._is_locked(stat)))
-            stat['hidden'] = int(self._attr(path, 'hidden', self._is_hidden(stat)) if \
-                                 self.mime_accepted(stat['mime']) else True) 
-
-            if stat['read'] and not self._is_hidden(stat):
-
-                if stat['mime'] == 'directory': #handle directories
-                    if self._options['checkSubfolders']:
-                        if 'dirs' in stat:
-                            if not stat['dirs']:
-                                del stat['dirs']
-                        elif 'alias' in stat and stat['alias'] and 'target' in stat and stat['target']:
-                            stat['dirs'] = int('dirs' in stat_cache[stat['target']]) if stat['target'] in stat_cache else int(self._subdirs(stat['target'])) 
-                        elif self._subdirs(path):
-                            stat['dirs'] = 1
-                    else:
-                        stat['dirs'] = 1
-                else: #file
-                    if not 'tmb' in stat and self._can_create_tmb(path, stat):
-                        stat['tmb'] = self._get_tmb(stat['target'] if 'target' in stat else path, stat)
-                    if not 'dim' in stat and stat['mime'].startswith('image'):
-                        try:
-                            stat['dim'] = self._dimensions(path)
-                        except NotAnImageError:
-                            stat['dim'] = _('Unknown')
-
-            if 'alias' in stat and stat['alias'] and 'target' in stat and stat['target']:
-                stat['thash'] = self.encode(stat['target'])
-                del stat['target']
-    
-            stat_cache = stat
-            
-            if self._options['cache']:
-                cache.set(cache_key, stat_cache, self._options['cache'])
-                self.logger.debug('%s: Caching STAT %s' % (self.id(), path))
-            if root_cache != self._root:
-                cache.set('elfinder::stat::%sroot' % self.id(), self._root, 60 * 60 * 24 * 10)
+    def changed(self, path, removed=False, is_dir=None, moved=False):
+        """
+        Drop the cached data of ``path`` and its parent directory, after
+        ``path`` was created, modified or ``removed`` by another 
+        application (see the :ref:`command-elfinder_watch` command). 
+        The thumbnail of a modified or removed file is removed as well.
+        
+        ``is_dir`` tells whether ``path`` is a directory, if known (e.g. 
+        from the inotify event), otherwise its cached fileinfo is consulted.
+        The cached data below a directory that was removed or ``moved`` 
+        there from elsewhere is dropped at once.
+        """
+        stat = self._cached_stat(path)
+        if is_dir is None:
+            is_dir = bool(stat) and stat['mime'] == 'directory'
+        
+        if is_dir:
+            if removed or moved:
+                self._bump_dir_token(path)
+        elif stat and stat['mime'] != 'directory':
+            self._rm_tmb(stat, False)
         
-        return stat_cache
+        self._clear_cached_dir(path)
+        if path != self._root:
+            self._clear_cached_dir(self._dirname(path))
+    
+    def _cached_stat(self, path):
+        """
+        Return the cached fileinfo of ``path`` or ``None``, without 
+        computing it on a cache miss.
+        """
+        envelope = self._cache_read(self._cache_key('stat', path))
+        return envelope[1] if envelope is not None else None
+    
+    def _build_stats(self, paths, check_subfolders=None):
+        """
+        Compute the fileinfo of all valid ``paths``, bypassing the cache.
+        Return a dictionary mapping each path to its fileinfo.
+        """
+        raw = {}
+        for p in paths:
+            try:
+                raw[p] = self._stat(p)
+            except os.error:
+                continue
+        
+        #only paths that exist get ids in the path index
+        self._index_hashes(raw.keys())
+        self._batch_attrs(raw.keys())
+        
+        result = {}
+        for p, stat in raw.items():
+            try:
+                result[p] = self._build_stat(p, check_subfolders=check_subfolders, raw=stat)
+            except os.error:
+                continue
+        return result
+    
+    def _build_stat(self, path, fields=None, check_subfolders=None, raw=None):
+        """
+        Compute the fileinfo of ``path``, bypassing the cache. Of the
+        optional fields, only ``fields`` are computed (by default those set
+        by :func:`elfinder.volumes.base.ElfinderVolumeDriver.set_fields`).
+        ``check_subfolders`` overrides the ``checkSubfolders`` option.
+        The ``raw`` stat of ``path`` (see 
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._stat`) can be
+        passed if it is already known. Raises os.error if the path is invalid.
+        """
+        fields = self._fields if fields is None else fields
+        if check_subfolders is None:
+            check_subfolders = self._options['checkSubfolders']
+        stat = self._stat(path) if raw is None else raw
+        stat['hash'] = self.encode(path)
+        
+        if path == self._root:
+            stat['volumeid'] = self.id()
+            stat['name'] = self._root_name
+        else:
+            if not 'name' in stat or not stat['name']:
+                stat['name'] = self._basename(path)
+        
+            if not 'phash' in stat or not stat['phash']:
+                stat['phash'] = self.encode(self._dirname(path))
+            
+        if not 'size' in stat or (not stat['size'] and stat['mime'] == 'directory'):
+            stat['size'] = 'unknown'
+        
+        stat['read'] = int(self._attr(path, 'read', stat['read']))
+        stat['write'] = int(self._attr(path, 'write', stat['write']))
+        stat['locked'] = int(self._attr(path, 'locked', self._is_locked(stat)))
+        #the mime filter is applied when listing, so that cached stats do not depend on it
+        stat['hidden'] = int(self._attr(path, 'hidden', self._is_hidden(stat)))
+
+        if stat['read'] and not self._is_hidden(stat):
+
+            if stat['mime'] == 'directory': #handle directories
+                if not 'dirs' in fields:
+                    stat.pop('dirs', None)
+                elif check_subfolders:
+                    if 'dirs' in stat:
+                        if not stat['dirs']:
+                            del stat['dirs']
+                    elif 'alias' in stat and stat['alias'] and 'target' in stat and stat['target']:
+                        stat['dirs'] = int(bool(self._subdirs(stat['target'])))
+                    elif self._subdirs(path):
+                        stat['dirs'] = 1
+                else:
+                    stat['dirs'] = 1
+            else: #file
+                if not 'tmb' in fields:
+                    stat.pop('tmb', None)
+                elif not 'tmb' in stat and self._can_create_tmb(path, stat):
+                    stat['tmb'] = self._get_tmb(stat['target'] if 'target' in stat else path, stat)
+                if not 'dim' in fields:
+                    stat.pop('dim', None)
+                elif not 'dim' in stat and stat['mime'].startswith('image'):
+                    try:
+                        stat['dim'] = self._dimensions(path)
+                    except NotAnImageError:
+                        stat['dim'] = _('Unknown')
+
+        if 'alias' in stat and stat['alias'] and 'target' in stat and stat['target']:
+            stat['thash'] = self.encode(stat['target'])
+            del stat['target']
+        
+        stat = ElfinderStat(stat)
+        stat.fields = fields
+        return stat
     
     def mimetype(self, path, name = ''):
         """
@@ -1224,25 +1725,97 @@ class ElfinderVolumeDriver(object):
         
         if not attr in self._defaults:
             return False
-
-        #TODO: replace this with signals??
-        if self._options['accessControl'] and hasattr(self._options['accessControl'], '__call__'):
-            perm = self._options['accessControl'](attr, path, self)
-            if perm != None:
-                return perm
-
-        for attrs in self._attributes:
-            if attr in attrs and re.search(attrs['pattern'], '%s%s' % (self._separator, self._relpath(path))):
-                return attrs[attr]
+        
+        perm = self._attrs(path)[attr]
+        if perm != None:
+            return perm
                 
         return self._defaults[attr] if not val else val
     
-    def _size(self, path):
+    def _attrs(self, path):
         """
-        Return file or directory total size.
+        Return a dictionary holding all file attributes of ``path``, as 
+        set by the :ref:`setting-accessControlBatch` or 
+        :ref:`setting-accessControl` callables or the 
+        :ref:`setting-attributes` rules (``None`` for attributes
+        that neither of them sets). The rules are evaluated in a single pass
+        and the result is memoized per request view.
         """
+        rules = self._compile_attributes()
         try:
-            stat = self.stat(path)
+            return self._attr_memo[path]
+        except KeyError:
+            pass
+        
+        attrs = dict((attr, None) for attr in self._defaults)
+        #attributes set by the accessControlBatch callable are final
+        batch = self._attr_batch.pop(path, {})
+        #TODO: replace this with signals??
+        if self._options['accessControl'] and hasattr(self._options['accessControl'], '__call__'):
+            for attr in attrs:
+                if not attr in batch:
+                    attrs[attr] = self._options['accessControl'](attr, path, self)
+        for attr in attrs:
+            if attr in batch:
+                attrs[attr] = batch[attr]
+        
+        pending = set(attr for attr in attrs if attrs[attr] == None)
+        if pending:
+            relpath = '%s%s' % (self._separator, self._relpath(path))
+            for search, values in rules:
+                keys = pending.intersection(values)
+                if keys and search(relpath):
+                    for key in keys:
+                        attrs[key] = values[key]
+                    pending -= keys
+                    if not pending:
+                        break
+        
+        self._attr_memo[path] = attrs
+        return attrs
+    
+    def _batch_attrs(self, paths):
+        """
+        Call the :ref:`setting-accessControlBatch` callable once for
+        each directory holding some of the ``paths``, to fetch the attributes
+        of all ``paths`` that are not memoized yet in advance.
+        """
+        access = self._options['accessControlBatch']
+        if not access or not hasattr(access, '__call__'):
+            return
+        
+        dirs = {}
+        for p in paths:
+            if not p in self._attr_memo and not p in self._attr_batch:
+                dirs.setdefault(self._dirname(p) if p != self._root else p, []).append(p)
+        
+        for dir_, children in dirs.items():
+            attrs = access(dir_, children, self) or {}
+            for p in children:
+                if p in attrs and attrs[p]:
+                    self._attr_batch[p] = attrs[p]
+    
+    def _compile_attributes(self):
+        """
+        Compile the attribute rules, i.e. the :ref:`setting-attributes`
+        option and the rules added by the driver, into a list of 
+        ``(pattern search function, attribute values)`` tuples. The rules 
+        are compiled again only if more rules have been added since, 
+        dropping the memoized attributes.
+        """
+        if self._attribute_rules is None or self._attribute_rules[0] != len(self._attributes):
+            rules = [(re.compile(a['pattern']).search, dict((k, a[k]) for k in self._defaults if k in a)) for a in self._attributes]
+            self._attribute_rules = (len(self._attributes), rules)
+            self._attr_memo = {}
+        return self._attribute_rules[1]
+    
+    def _size(self, path, stat=None):
+        """
+        Return file or directory total size. The ``stat`` of ``path``
+        can be passed if it is already known.
+        """
+        try:
+            stat = stat or self.stat(path)
         except os.error:
             return 0  
         
@@ -1252,16 +1825,16 @@ class ElfinderVolumeDriver(object):
         if stat['mime'] != 'directory':
             return stat['size']
         
-        subdirs = self._options['checkSubfolders']
-        self._options['checkSubfolders'] = True
         result = 0
 
-        for stat in self._get_scandir(path):
-            size = self._size(self._join_path(path, stat['name'])) if stat['mime'] == 'directory' and stat['read'] else stat['size']
+        #the view is shared by concurrent targets, pass the option instead of setting it
+        for p, stat in self._iter_stats(self._get_cached_dir(path), check_subfolders=True):
+            if self._is_hidden(stat):
+                continue
+            size = self._size(p, stat) if stat['mime'] == 'directory' else stat['size']
             if (size > 0):
                 result += size
 
-        self._options['checkSubfolders'] = subdirs
         return result
 
     def _closest_by_attr(self, path, attr, val):
@@ -1293,14 +1866,100 @@ class ElfinderVolumeDriver(object):
         """
         Return required directory files info.
         """
+        return list(self._iter_scandir(path))
+    
+    def _iter_scandir(self, path):
+        """
+        Generate the required directory files info, one file at a time.
+        Files that cannot be stat'ed (e.g. invalid links) and files not 
+        accepted by the mime filter are skipped.
+        """
+        for p, stat in self._iter_stats(self._get_cached_dir(path)):
+            if not self._is_hidden(stat) and self.mime_accepted(stat['mime']):
+                yield stat
+    
+    def _prefetch(self, iterator):
+        """
+        Advance ``iterator`` to its first item and return an iterator over
+        all of its items. This reads the directory listing and the first
+        batch of stats right away, so that errors are raised before a lazy
+        file list is returned (i.e. before the response starts streaming).
+        """
+        try:
+            first = next(iterator)
+        except StopIteration:
+            return iter([])
+        return chain([first], iterator)
+    
+    def _iter_stats(self, paths, chunk_size=500, check_subfolders=None):
+        """
+        Generate a ``(path, fileinfo)`` tuple for each one of the ``paths``. 
+        The fileinfo is fetched in batches of ``chunk_size`` paths using
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver.stat_many`.
+        Invalid paths are skipped.
+        """
+        paths = iter(paths)
+        while True:
+            chunk = list(islice(paths, chunk_size))
+            if not chunk:
+                break
+            
+            stats = self.stat_many(chunk, check_subfolders)
+            for p in chunk:
+                if p in stats:
+                    yield (p, stats[p])
 
-        files = []
-        for p in self._get_cached_dir(path):
-            stat = self.stat(p)
-            if not self._is_hidden(stat):
-                files.append(stat)
-
-        return files
+    def _get_sorted_dir(self, path, sort):
+        """
+        Return the ``(sort value, name)`` tuples of a directory's files,
+        sorted by the ``sort`` key. The index is cached.
+        """
+        def build():
+            index = []
+            for p in self._get_cached_dir(path):
+                try:
+                    index.append((self._sort_value(p, sort), self._basename(p)))
+                except os.error:
+                    continue
+            index.sort()
+            self.logger.debug('%s: Caching %s INDEX %s' % (self.id(), sort, path))
+            return index
+        
+        return self._fetch_dir('index::%s' % sort, path, build)
+    
+    def _sort_value(self, path, sort):
+        """
+        Return the value of the ``sort`` stat key (see 
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver.page`) for ``path``,
+        used to build the sorted directory indexes. Drivers may override 
+        this to avoid a full :func:`elfinder.volumes.base.ElfinderVolumeDriver._stat` call.
+        Raises os.error if the path is invalid.
+        """
+        if sort == 'name':
+            return self._basename(path)
+        stat = self._stat(path)
+        return stat[sort] if sort in stat else ''
+    
+    def _encode_cursor(self, entry, sort):
+        """
+        Return an opaque cursor pointing to a sorted index ``entry``.
+        """
+        return urlsafe_b64encode(json.dumps([sort, entry[0], entry[1]]))
+    
+    def _decode_cursor(self, cursor, sort):
+        """
+        Return the sorted index entry a ``cursor`` points to.
+        Raises a ``ValueError`` if the cursor is invalid or was
+        created for a different ``sort``.
+        """
+        try:
+            cursor = json.loads(urlsafe_b64decode(cursor.encode('ascii') + '=' * ((4 - len(cursor) % 4) % 4)))
+        except (TypeError, UnicodeError, ValueError):
+            raise ValueError('Invalid cursor')
+        
+        if not isinstance(cursor, list) or len(cursor) != 3 or cursor[0] != sort:
+            raise ValueError('Invalid cursor')
+        return (cursor[1], cursor[2])
 
     def _get_tree(self, path, deep, exclude=''):
         """
@@ -1308,8 +1967,7 @@ class ElfinderVolumeDriver(object):
         """
 
         dirs = []
-        for p in self._get_cached_dir(path):
-            stat = self.stat(p)
+        for p, stat in self._iter_stats(self._get_cached_dir(path)):
             if not self._is_hidden(stat) and p != exclude and stat['mime'] == 'directory':
                 dirs.append(stat)
                 if deep > 0 and 'dirs' in stat and stat['dirs']:
@@ -1321,13 +1979,15 @@ class ElfinderVolumeDriver(object):
         Recursively search for files in the specified path,
         based on the ``q`` query.
         """
-        result = []
-        for p in self._get_cached_dir(path):
-            try:
-                stat = self.stat(p)
-            except os.error: #invalid links
-                continue
-
+        return list(self._iter_search(path, q))
+    
+    def _iter_search(self, path, q):
+        """
+        Generate the :func:`elfinder.volumes.base.ElfinderVolumeDriver._search`
+        results, one file at a time.
+        """
+        #invalid links are skipped
+        for p, stat in self._iter_stats(self._get_cached_dir(path)):
             if self._is_hidden(stat) or not self.mime_accepted(stat['mime']):
                 continue
             
@@ -1337,12 +1997,11 @@ class ElfinderVolumeDriver(object):
                 stat['path'] = self._path(p)
                 if self._options['URL'] and not 'url' in stat:
                     stat['url'] = self._options['URL'] + p[len(self._root) + 1:].replace(self._separator, '/')
-                result.append(stat)
+                yield stat
 
             if stat['mime'] == 'directory' and stat['read'] and not 'alias' in  stat:
-                result += self._search(p, q)
-
-        return result
+                for stat in self._iter_search(p, q):
+                    yield stat
         
     #**********************  manipulations  ******************#
 
@@ -1416,7 +2075,10 @@ class ElfinderVolumeDriver(object):
         self._clear_cached_dir(self._dirname(src))
         self._clear_cached_stat(src)
         self._clear_cached_dir(dst)
-        self._removed.append(stat)
+        if stat['mime'] == 'directory':
+            self._bump_dir_token(src)
+        self._index_moved(src, self._join_path(dst, name))
+        self._add_removed(stat)
         
         return self._join_path(dst, name)
 
@@ -1502,7 +2164,10 @@ class ElfinderVolumeDriver(object):
 
         self._clear_cached_dir(path)
         self._clear_cached_dir(self._dirname(path))
-        self._removed.append(stat)
+        if stat['mime'] == 'directory':
+            self._bump_dir_token(path)
+        self._index_removed(path)
+        self._add_removed(stat)
     
     #************************* thumbnails **************************#
 
@@ -1523,7 +2188,8 @@ class ElfinderVolumeDriver(object):
 
             name = self._tmb_name(stat)
             try:
-                self.stat(self._join_path(self._options['tmbPath'], name))
+                #probe the file directly, stat() would give the thumbnail an id in the path index
+                self._stat(self._join_path(self._options['tmbPath'], name))
                 return name
             except os.error:
                 pass
@@ -1614,8 +2280,9 @@ class ElfinderVolumeDriver(object):
         if stat['mime'] == 'directory' and recursion:
             for p in self._get_cached_dir(self.decode(stat['hash'])):
                 self._rm_tmb(self.stat(p))
-        elif 'tmb' in stat and stat['tmb'] != 1:
-            tmb = self._join_path(self._options['tmbPath'], stat['tmb'])
+        elif self._options['tmbPath'] and stat['mime'].startswith('image') and stat.get('tmb') != 1:
+            #stats built without the tmb field (see set_fields) do not tell if there is a thumbnail
+            tmb = self._join_path(self._options['tmbPath'], stat['tmb'] if 'tmb' in stat else self._tmb_name(stat))
             try:
                 self._clear_cached_dir(self._options['tmbPath'])
                 self._clear_cached_stat(tmb)
@@ -1725,6 +2392,14 @@ class ElfinderVolumeDriver(object):
 
         return self._get_available_name(dir_, name, ext, i)
     
+    def _add_removed(self, stat):
+        """
+        Add a file ``stat`` to the removed files list. This is
+        thread-safe, see :func:`elfinder.connector.ElfinderConnector._map`.
+        """
+        with self._removed_lock:
+            self._removed.append(stat)
+    
     def _is_hidden(self, stat):
         """
         Check if the file/directory is hidden
@@ -1775,35 +2450,428 @@ class ElfinderVolumeDriver(object):
             return not re.match(r'([a-zA-Z]+:)?\\$') is None
         return path.startswith(os.sep)
     
+    def invalidate(self):
+        """
+        Invalidate all cached data of this volume in every process, by
+        increasing the volume's cache generation (see 
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._cache_key`).
+        """
+        try:
+            cache.incr(self._generation_key())
+            self._count('cacheSet')
+        except ValueError: #no generation yet, nothing is cached
+            pass
+        self._cache_generation = None
+    
+    def _generation_key(self):
+        """
+        Return the cache key of the volume's generation. It includes a 
+        digest of the root path, so that data cached for a different root
+        is never used.
+        """
+        root = self._root.encode('utf-8') if isinstance(self._root, unicode) else self._root
+        return 'elfinder::generation::%s::%s' % (self.id(), md5(root).hexdigest())
+    
+    def _generation(self):
+        """
+        Return the volume's cache generation. It is fetched from the
+        cache once per request view and initialized to a random number
+        if missing, so that stale entries of an evicted generation are
+        never reused.
+        """
+        if self._cache_generation is None:
+            key = self._generation_key()
+            generation = self._cache_get(key)
+            if generation is None:
+                generation = random.randint(0, 2**31)
+                self._count('cacheSet')
+                if not cache.add(key, generation, GENERATION_TIMEOUT):
+                    #another process initialized it first
+                    generation = self._cache_get(key) or generation
+            self._cache_generation = generation
+        return self._cache_generation
+    
+    def _cache_key(self, kind, path, own=False):
+        """
+        Return the cache key of the ``kind`` data (e.g. ``'stat'`` or 
+        ``'listdir'``) cached for ``path``. Keys include the volume's
+        cache generation, so increasing it invalidates all keys at once.
+        
+        Keys also include a digest of the tokens of the directories
+        ``path`` lies in (see 
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._bump_dir_token`)
+        and the children token of its parent directory (see
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._bump_dir_children`).
+        If ``own`` is ``True``, the tokens of the ``path`` directory itself
+        are used instead of its parent's; this is used for directory data
+        (e.g. listings).
+        """
+        rel = self._relpath(path)
+        #a digest of the path keeps keys short for deep paths (e.g. memcached keys are up to 250 bytes);
+        #unlike the hash, it never assigns path index ids to paths that may not exist
+        name = '%s%s' % (self.id(), rel)
+        digest = md5(name.encode('utf-8') if isinstance(name, unicode) else name).hexdigest()
+        if not own:
+            rel = rel.rpartition(self._separator)[0]
+        return 'elfinder::%s::%s::%s::%s' % (kind, self._generation(), self._key_chain(rel), digest)
+    
+    def _key_chain(self, rel):
+        """
+        Return a digest of the tokens of the ``rel`` directory (relative
+        to the root) and all of its ancestors, and of the children token of
+        the ``rel`` directory. Missing tokens are fetched with a single cache
+        request and the result is memoized per request view.
+        """
+        if not rel in self._key_chains:
+            parts = rel.split(self._separator) if rel else []
+            dirs = [self._separator.join(parts[:i+1]) for i in range(len(parts))]
+            
+            missing = dict((self._token_key(d), (self._dir_tokens, d)) for d in dirs if not d in self._dir_tokens)
+            if not rel in self._children_tokens:
+                missing[self._token_key(rel, 'children')] = (self._children_tokens, rel)
+            if missing:
+                tokens = self._cache_get_many(missing.keys())
+                for key, (memo, d) in missing.items():
+                    if not key in tokens:
+                        #initialize to a random value, like the generation
+                        tokens[key] = random.randint(0, 2**31)
+                        self._count('cacheSet')
+                        if not cache.add(key, tokens[key], GENERATION_TIMEOUT):
+                            tokens[key] = self._cache_get(key) or tokens[key]
+                    memo[d] = tokens[key]
+            
+            chain = [str(self._dir_tokens[d]) for d in dirs] + [str(self._children_tokens[rel])]
+            self._key_chains[rel] = md5(':'.join(chain)).hexdigest()[:16]
+        return self._key_chains[rel]
+    
+    def _token_key(self, rel, kind='token'):
+        """
+        Return the cache key of the ``rel`` directory (relative to the root) 
+        token, or of its children token if ``kind`` is ``'children'``.
+        """
+        return 'elfinder::%s::%s::%s' % (kind, self.id(), md5(rel.encode('utf-8') if isinstance(rel, unicode) else rel).hexdigest())
+    
+    def _bump_dir_token(self, path):
+        """
+        Change the token of the ``path`` directory. This invalidates the 
+        cached data of the directory and all of its descendants at once,
+        since their cache keys include the token (see 
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._cache_key`).
+        Called when a directory is renamed, moved or removed.
+        """
+        rel = self._relpath(path)
+        if not rel:
+            return self.invalidate()
+        
+        token = random.randint(0, 2**31)
+        self._cache_set(self._token_key(rel), token, GENERATION_TIMEOUT)
+        self._dir_tokens[rel] = token
+        for chain in self._key_chains.keys():
+            if chain == rel or chain.startswith(rel + self._separator):
+                #other threads of the view may drop the same chains
+                self._key_chains.pop(chain, None)
+    
+    def _bump_dir_children(self, path):
+        """
+        Change the children token of the ``path`` directory. This invalidates
+        the cached listing and sorted indexes of the directory and the 
+        fileinfo of its direct children, while the cached data of deeper 
+        descendants is kept, since their keys do not include the token.
+        Called when the directory signature changes (see 
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._fetch_dir`).
+        """
+        rel = self._relpath(path)
+        token = random.randint(0, 2**31)
+        self._cache_set(self._token_key(rel, 'children'), token, GENERATION_TIMEOUT)
+        self._children_tokens[rel] = token
+        self._key_chains.pop(rel, None)
+    
+    def _reset_counters(self):
+        """
+        Reset the operation counters and timers.
+        """
+        self._counters_lock = threading.Lock()
+        self._counters = dict.fromkeys(COUNTERS, 0)
+        self._timers = {}
+    
+    def _count(self, counter, value=1, elapsed=None):
+        """
+        Increase a ``counter`` by ``value`` and add ``elapsed`` seconds
+        to its timer. See :func:`elfinder.volumes.base.ElfinderVolumeDriver.debug`.
+        """
+        with self._counters_lock:
+            self._counters[counter] = self._counters.get(counter, 0) + value
+            if elapsed is not None:
+                self._timers[counter] = self._timers.get(counter, 0) + elapsed
+    
+    def _cache_get(self, key):
+        """
+        Return the cached value for ``key`` or ``None`` on a cache miss.
+        All cache reads of the driver should go through this method.
+        """
+        start = time.time()
+        value = cache.get(key, None)
+        self._count('cacheGet', elapsed=time.time() - start)
+        self._count('cacheMiss' if value is None else 'cacheHit')
+        return value
+    
+    def _cache_get_many(self, keys):
+        """
+        Return a dictionary holding the cached values of ``keys``, 
+        fetched with a single cache request. Missing keys are left out.
+        """
+        start = time.time()
+        values = cache.get_many(keys)
+        self._count('cacheGet', elapsed=time.time() - start)
+        self._count('cacheHit', len(values))
+        self._count('cacheMiss', len(set(keys)) - len(values))
+        return values
+    
+    def _cache_set(self, key, value, timeout):
+        """
+        Cache ``value`` under ``key`` for ``timeout`` seconds.
+        All cache writes of the driver should go through this method.
+        """
+        start = time.time()
+        cache.set(key, value, timeout)
+        self._count('cacheSet', elapsed=time.time() - start)
+    
+    def _cache_set_many(self, data, timeout):
+        """
+        Cache all key/value pairs of the ``data`` dictionary for ``timeout`` 
+        seconds, using a single cache request.
+        """
+        start = time.time()
+        cache.set_many(data, timeout)
+        self._count('cacheSet', elapsed=time.time() - start)
+    
+    def _cache_delete(self, key):
+        """
+        Delete the ``key`` cache entry.
+        """
+        start = time.time()
+        cache.delete(key)
+        self._count('cacheDelete', elapsed=time.time() - start)
+    
+    def _cache_delete_many(self, keys):
+        """
+        Delete the cache entries of all ``keys``.
+        """
+        start = time.time()
+        cache.delete_many(keys)
+        self._count('cacheDelete', len(keys), time.time() - start)
+    
+    def _cache_fetch(self, key, build, pack=False, lock_miss=True):
+        """
+        Return the value cached under ``key``. On a miss, ``build`` is 
+        called to compute the value, which is then cached for 
+        :ref:`setting-cache` seconds. If ``pack`` is ``True``, large values
+        are compressed or split (see 
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._cache_pack`);
+        this is meant for directory data, since measuring a value pickles it.
+        
+        Rebuilds are single-flight: only the request that acquires the
+        ``key`` lock rebuilds it. Expired values are kept for 
+        :ref:`setting-cacheStale` more seconds and are served to
+        other requests while the rebuild is in progress. Requests that find
+        no value at all wait up to :ref:`setting-cacheWait` seconds for
+        the rebuild to finish, before computing the value themselves. If
+        ``lock_miss`` is ``False``, they compute it right away without 
+        taking the lock, like 
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver.stat_many` does;
+        this suits values that are cheap to build (e.g. stats, including 
+        those of missing paths).
+        """
+        if not self._options['cache']:
+            return build()
+        
+        envelope = self._cache_read(key)
+        if envelope is not None and envelope[0] > time.time():
+            return envelope[1]
+        
+        if envelope is None and not lock_miss:
+            value = build()
+            self._cache_set(key, self._cache_envelope(self._cache_pack(key, value) if pack else value), self._cache_timeout())
+            return value
+        
+        if not self._cache_lock(key):
+            if envelope is not None:
+                self._count('cacheStaleHit')
+                return envelope[1]
+            
+            envelope = self._cache_wait(key)
+            if envelope is not None:
+                return envelope[1]
+            #the rebuild is taking too long, do not wait any further
+            return build()
+        
+        try:
+            value = build()
+            self._cache_set(key, self._cache_envelope(self._cache_pack(key, value) if pack else value), self._cache_timeout())
+        finally:
+            self._cache_unlock(key)
+        return value
+    
+    def _cache_read(self, key):
+        """
+        Return the ``(expiration time, value)`` envelope cached under
+        ``key`` by :func:`elfinder.volumes.base.ElfinderVolumeDriver._cache_fetch`,
+        or ``None`` on a cache miss.
+        """
+        envelope = self._cache_get(key)
+        if envelope is not None:
+            value = self._cache_unpack(envelope[1])
+            if value is not None:
+                return (envelope[0], value)
+    
+    def _cache_pack(self, key, value):
+        """
+        Prepare ``value`` to be cached under ``key``. Values whose pickled 
+        size exceeds :ref:`setting-cacheCompress` bytes are compressed. 
+        Values still larger than :ref:`setting-cacheChunkSize` bytes are 
+        split in many cache entries, so that they fit in the size limit of
+        the cache backend (e.g. 1MB for memcached). In both cases a
+        :class:`elfinder.volumes.base.PackedValue` is returned instead of
+        ``value``.
+        """
+        compress = self._options['cacheCompress']
+        chunk_size = self._options['cacheChunkSize']
+        if not compress and not chunk_size:
+            return value
+        
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        compressed = bool(compress) and len(data) > compress
+        if compressed:
+            data = zlib.compress(data)
+        
+        if chunk_size and len(data) > chunk_size:
+            #part keys are unique per write, so that readers never mix parts of different writes
+            prefix = '%s::part::%s' % (key, random.randint(0, 2**31))
+            keys = ['%s::%s' % (prefix, i) for i in range((len(data) - 1) // chunk_size + 1)]
+            self._cache_set_many(dict((k, data[i * chunk_size:(i+1) * chunk_size]) for i, k in enumerate(keys)), self._cache_timeout())
+            return PackedValue(compressed, None, keys)
+        
+        return PackedValue(compressed, data, None) if compressed else value
+    
+    def _cache_unpack(self, value):
+        """
+        Return the original value of a cached ``value`` (see
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._cache_pack`), or 
+        ``None`` if any of its parts has been evicted from the cache.
+        """
+        if not isinstance(value, PackedValue):
+            return value
+        
+        data = value.data
+        if value.parts:
+            parts = self._cache_get_many(value.parts)
+            if len(parts) != len(value.parts):
+                return None
+            data = ''.join([parts[k] for k in value.parts])
+        
+        try:
+            return pickle.loads(zlib.decompress(data) if value.compressed else data)
+        except (zlib.error, pickle.UnpicklingError):
+            return None
+    
+    def _cache_envelope(self, value):
+        """
+        Wrap ``value`` with its expiration time, to be cached by 
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._cache_fetch`.
+        """
+        return (time.time() + self._options['cache'], value)
+    
+    def _cache_timeout(self):
+        """
+        Return the timeout of cache envelopes, which includes the 
+        :ref:`setting-cacheStale` period.
+        """
+        return self._options['cache'] + self._options['cacheStale']
+    
+    def _cache_lock(self, key):
+        """
+        Try to acquire the rebuild lock of ``key``.
+        Return ``True`` on success.
+        """
+        self._count('cacheLock')
+        return cache.add(self._lock_key(key), 1, LOCK_TIMEOUT)
+    
+    def _cache_unlock(self, *keys):
+        """
+        Release the rebuild locks of ``keys``.
+        """
+        if keys:
+            self._cache_delete_many([self._lock_key(key) for key in keys])
+    
+    def _lock_key(self, key):
+        """
+        Return the cache key of the ``key`` rebuild lock.
+        """
+        return 'elfinder::lock::%s' % md5(key.encode('utf-8') if isinstance(key, unicode) else key).hexdigest()
+    
+    def _cache_wait(self, key):
+        """
+        Poll the cache for up to :ref:`setting-cacheWait` seconds, waiting
+        for another request to rebuild ``key``. Return the cache envelope
+        or ``None`` if it is not rebuilt in time.
+        """
+        self._count('cacheWait')
+        deadline = time.time() + self._options['cacheWait']
+        while time.time() < deadline:
+            time.sleep(0.05)
+            envelope = self._cache_read(key)
+            if envelope is not None:
+                return envelope
+    
     def _clear_cached_stat(self, path):
         """
         Clear the cache for this file ``path``.
         """
-        cache.delete('elfinder::stat::%s' % self.encode(path))
+        self._cache_delete(self._cache_key('stat', path))
+        #the file may have moved in the parent directory's sorted indexes
+        if path != self._root:
+            parent = self._dirname(path)
+            self._cache_delete_many([self._cache_key('index::%s' % sort, parent, True) for sort in self._sort_keys if sort != 'name'])
         
     def _get_cached_dir(self, path):
         """
         Get the cached stat info for this directory ``path``, if any.
         """
-        cache_key = 'elfinder::listdir::%s' % self.encode(path)
-        dir_cache = cache.get(cache_key, None)
-        root_cache = cache.get('elfinder::stat::%sroot' % self.id())
+        def build():
+            self.logger.debug('%s: Caching DIR %s' % (self.id(), path))
+            return self._scandir(path)
         
-        if dir_cache is None or root_cache != self._root:
-            dir_cache = self._scandir(path)
-            if self._options['cache']:
-                self.logger.debug('%s: Caching DIR %s' % (self.id(), path))
-                cache.set(cache_key, dir_cache, self._options['cache'])
-            if root_cache != self._root:
-                cache.set('elfinder::stat::%sroot' % self.id(), self._root, 60 * 60 * 24 * 10)
-
-        return dir_cache
+        return self._fetch_dir('listdir', path, build)
+    
+    def _fetch_dir(self, kind, path, build):
+        """
+        Return the ``kind`` data cached for the ``path`` directory (see
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._cache_fetch`).
+        
+        If the driver provides a directory signature (see
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._dir_signature`),
+        it is cached along with the data. When the signature changes, the 
+        cached data of the directory and its direct children is dropped and
+        rebuilt.
+        """
+        signature = self._dir_signature(path) if self._options['cache'] else None
+        if signature is None:
+            return self._cache_fetch(self._cache_key(kind, path, True), build, True)
+        
+        signed = self._cache_fetch(self._cache_key(kind, path, True), lambda: (signature, build()), True)
+        if signed[0] != signature:
+            self.logger.debug('%s: DIR %s changed' % (self.id(), path))
+            self._clear_cached_stat(path)
+            self._bump_dir_children(path)
+            signed = self._cache_fetch(self._cache_key(kind, path, True), lambda: (signature, build()), True)
+        return signed[1]
     
     def _clear_cached_dir(self, path):
         """
         Clear cache for this directory ``path``.
         """
-        cache.delete('elfinder::listdir::%s' % self.encode(path))
+        self._cache_delete(self._cache_key('listdir', path, True))
+        self._cache_delete_many([self._cache_key('index::%s' % sort, path, True) for sort in self._sort_keys])
         #clear the stat record as well
         self._clear_cached_stat(path)
         
@@ -1811,6 +2879,19 @@ class ElfinderVolumeDriver(object):
     #*                  API TO BE IMPLEMENTED IN SUB-CLASSES             *#
     #*********************************************************************#
 
+    def _dir_signature(self, path):
+        """
+        Return a value that changes whenever entries are added to or 
+        removed from the ``path`` directory (e.g. its modification time),
+        or ``None`` if cached directory data should only expire after 
+        :ref:`setting-cache` seconds. Drivers that can read it cheaply may 
+        override this, so that changes made by other applications are 
+        noticed without waiting for the cache to expire.
+        
+        This implementation returns ``None``.
+        """
+        return None
+
     def _dirname(self, path):
         """
         Return parent directory path. This method
@@ -1,9 +1,10 @@
-import os, re, time, shutil, magic
+import os, re, time, shutil, magic, urllib
 try:
     from PIL import Image
 except ImportError:
     import Image
 from hashlib import md5
+from stat import S_ISDIR
 from django.conf import settings
 from elfinder.exceptions import ElfinderErrorMessages, NotAnImageError, DirNotFoundError
 from base import ElfinderVolumeDriver
@@ -28,6 +29,12 @@ class ElfinderVolumeLocalFileSystem(ElfinderVolumeDriver):
         
         self._options['dirMode']  = 0755 #new dirs mode
         self._options['fileMode'] = 0644 #new files mode
+        #let the web server send files: '' (disabled), 'X-Sendfile' or 'X-Accel-Redirect'
+        self._options['sendFile'] = ''
+        #internal location prefix mapped to the root, used with 'X-Accel-Redirect'
+        self._options['sendFilePrefix'] = ''
+        #validate cached dir data against the dir modification time on each access
+        self._options['cacheValidate'] = False
         
     #*********************************************************************#
     #*                        INIT AND CONFIGURE                         *#
@@ -71,6 +78,28 @@ class ElfinderVolumeLocalFileSystem(ElfinderVolumeDriver):
             if self._options['tmbPath'].startswith(self._root):
                 self._options['tmbURL'] = self._urlize(self._options['URL'] + self._options['tmbPath'][len(self._root)+1:].replace(self._separator, '/'))
             
+    def sendfile(self, hash_):
+        """
+        Return the header that lets the front-end web server send the file,
+        according to the :ref:`setting-sendFile` option.
+        For `'X-Accel-Redirect'` the header value is the file path relative
+        to the root, prefixed by the :ref:`setting-sendFilePrefix` option.
+        For any other header (e.g. `'X-Sendfile'`) the value is the 
+        absolute file path.
+        
+        See :func:`elfinder.volumes.base.ElfinderVolumeDriver.sendfile`.
+        """
+        header = self._options['sendFile']
+        if not header:
+            return None
+        
+        path = self.decode(hash_)
+        if header.lower() == 'x-accel-redirect':
+            url = self._relpath(path).replace(self._separator, '/')
+            return (header, '%s%s' % (self._urlize(self._options['sendFilePrefix'] or '/'), urllib.quote(url.encode('utf-8'))))
+        
+        return (header, path.encode('utf-8'))
+            
     #*********************************************************************#
     #*                  API TO BE IMPLEMENTED IN SUB-CLASSES             *#
     #*********************************************************************#
@@ -148,6 +177,36 @@ class ElfinderVolumeLocalFileSystem(ElfinderVolumeDriver):
         if stat['read']:
             stat['size'] = 0 if dir_ else size
         return stat
+    
+    def _sort_value(self, path, sort):
+        """
+        Return the ``sort`` stat key value for ``path``. Modification
+        times and sizes are read with a single ``os.stat`` call. See
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._sort_value`.
+        """
+        if sort in ['ts', 'size']:
+            try:
+                st = os.stat(path)
+            except os.error: #broken links
+                pass
+            else:
+                if sort == 'ts':
+                    return st.st_mtime
+                return 0 if S_ISDIR(st.st_mode) else st.st_size
+        return super(ElfinderVolumeLocalFileSystem, self)._sort_value(path, sort)
+   
+    def _dir_signature(self, path):
+        """
+        Return the inode and modification time of the ``path`` directory,
+        if the :ref:`setting-cacheValidate` option is set. See
+        :func:`elfinder.volumes.base.ElfinderVolumeDriver._dir_signature`.
+        """
+        if self._options['cacheValidate']:
+            try:
+                st = os.stat(path)
+            except os.error:
+                return None
+            return (st.st_ino, st.st_mtime)
    
     def _subdirs(self, path):
         """
@@ -3,6 +3,7 @@ try:
     from PIL import Image
 except ImportError:
     import Image
+from hashlib import md5
 from django.core.files.storage import FileSystemStorage
 from django.core.files.base import ContentFile
 from django.core.files import File as DjangoFile
@@ -125,8 +126,8 @@ class ElfinderVolumeStorage(ElfinderVolumeDriver):
         
         #disable rm command if delete is not implemented
         try:
-            #check against a non-existing file
-            self._options['storage'].delete(self.encode(str(time.time())))
+            #check against a non-existing file (not through encode(), that could add it to the path index)
+            self._options['storage'].delete(md5(str(time.time())).hexdigest())
         except NotImplementedError:
             if not 'rm' in self._options['disabled']:
                 self._options['disabled'].append('rm')